@@ -1,26 +1,39 @@
 import os
+import sys
+import queue
 import logging
-import json
+import itertools
+import orjson
 import re
 import time
+import random
+import hashlib
+import gzip
+import zlib
 from datetime import date, datetime, time as dtime, timezone
 from decimal import Decimal
-from uuid import UUID
+from uuid import UUID, uuid4
 import threading
 from time import sleep
 from collections import defaultdict
+import numpy as np
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 from flask import Flask, jsonify, request, abort, g, Response
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import psycopg2
+from psycopg2 import sql
+from psycopg2 import errors as pg_errors
 from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import ThreadedConnectionPool
 from typing import Optional
-from ua_parser import user_agent_parser
-from user_agents import parse as ua_parse
+import ua_parser
 import ipaddress
 import requests
-from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from functools import lru_cache, wraps
+from concurrent.futures import Future, ThreadPoolExecutor
+from cachetools import TTLCache
 
 # -------------------- Prometheus --------------------
 from prometheus_client import (
@@ -39,23 +52,59 @@ DB_PASS = os.getenv("DB_PASS", "")
 GEO_URL = os.getenv("GEO_URL", "http://ipgeo.epl-data.svc.cluster.local:8080")
 GEO_TIMEOUT = float(os.getenv("GEO_TIMEOUT", "0.35"))     # seconds
 GEO_CACHE_TTL = int(os.getenv("GEO_CACHE_TTL", "1800"))   # seconds (30m)
+GEO_CACHE_MAX = int(os.getenv("GEO_CACHE_MAX", "50000"))
+GEO_NEG_CACHE_TTL = int(os.getenv("GEO_NEG_CACHE_TTL", "300"))  # seconds
+GEO_WORKERS = int(os.getenv("GEO_WORKERS", "8"))
+GEO_PENDING_MAX = int(os.getenv("GEO_PENDING_MAX", "1024"))  # queued + running lookups
 
-POOL: Optional[SimpleConnectionPool] = None
+POOL: Optional[ThreadedConnectionPool] = None
 POOL_LOCK = threading.Lock()
+# ThreadedConnectionPool raises when exhausted; this makes checkout wait instead
+POOL_SEM: Optional[threading.BoundedSemaphore] = None
 
 
 POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+# per worker process: gunicorn threads + background refresh/streaming + headroom
 POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))         # seconds to wait for a free conn
+POOL_PING_IDLE = float(os.getenv("DB_POOL_PING_IDLE", "60"))    # ping conns idle longer than this
+# (cores * 2) + 1 spindle; past ~2x that a bigger pool only adds contention on the DB host
+DB_CORES = int(os.getenv("DB_CORES", "4"))
+POOL_RECOMMENDED = (DB_CORES * 2) + 1
+# fleet-wide budget: DB_MAX_CONNECTIONS split over every worker of every replica (0 = no ceiling)
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+API_WORKERS = int(os.getenv("WEB_CONCURRENCY", "4"))    # gunicorn -w
+API_REPLICAS = int(os.getenv("API_REPLICAS", "1"))
+POOL_METRICS_INTERVAL = float(os.getenv("DB_POOL_METRICS_INTERVAL", "5"))  # seconds
 
 CORS_ENABLED = os.getenv("CORS_ENABLED", "false").lower() == "true"
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "").split(",") if os.getenv("CORS_ORIGINS") else []
 
-ALLOWED_TEAM_TABLES = ["team_chances_created","team_chances_conceded","formations","shot_zone","shot_zone_conceded","timing","timing_conceded", "players"]
+ALLOWED_TEAM_TABLES = frozenset({"team_chances_created","team_chances_conceded","formations","shot_zone","shot_zone_conceded","timing","timing_conceded", "players"})
+
+# /leaders/<stat> -> players column (understat names)
+LEADER_STATS = {
+    "goals": "goals", "assists": "assists", "xg": "xG", "xa": "xA",
+    "npg": "npg", "npxg": "npxG", "shots": "shots", "key_passes": "key_passes",
+    "xgchain": "xGChain", "xgbuildup": "xGBuildup",
+}
 
 IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,63}$")
 
 MAX_LIMIT = int(os.getenv("MAX_PAGE_LIMIT", "1000"))
 DEFAULT_LIMIT = int(os.getenv("DEFAULT_PAGE_LIMIT", "200"))
+FPL_MAX_LIMIT = int(os.getenv("FPL_MAX_PAGE_LIMIT", "5000"))
+FPL_DEFAULT_LIMIT = int(os.getenv("FPL_DEFAULT_PAGE_LIMIT", "1000"))
+STREAM_ITERSIZE = int(os.getenv("STREAM_ITERSIZE", "500"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))      # seconds
+RESPONSE_CACHE_MAX = int(os.getenv("RESPONSE_CACHE_MAX", "512"))
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))     # bytes; smaller JSON goes out as-is
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "5"))
+
+# Visit log writer (batched stdout)
+VISIT_Q_MAX = int(os.getenv("VISIT_Q_MAX", "10000"))
+VISIT_FLUSH_BATCH = int(os.getenv("VISIT_FLUSH_BATCH", "256"))
+VISIT_FLUSH_INTERVAL = float(os.getenv("VISIT_FLUSH_INTERVAL", "0.25"))  # seconds
 
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -85,7 +134,7 @@ if CORS_ENABLED:
 class JsonFormatter(logging.Formatter):
     def format(self, record):
         payload = {
-            "ts": datetime.utcnow().isoformat() + "Z",
+            "ts": datetime.utcnow(),
             "level": record.levelname,
             "logger": record.name,
             "msg": record.getMessage(),
@@ -105,7 +154,7 @@ class JsonFormatter(logging.Formatter):
             payload["status"] = status
         if record.exc_info:
             payload["exc_info"] = self.formatException(record.exc_info)
-        return json.dumps(payload, ensure_ascii=False)
+        return orjson.dumps(payload, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z).decode()
 
 def _setup_logging():
     gunicorn_logger = logging.getLogger("gunicorn.error")
@@ -129,37 +178,77 @@ logger = logging.getLogger(__name__)
 def _is_public(path: str) -> bool:
     return path in PUBLIC_PATHS
 
-def _device_family(ua_str: str) -> str:
-    ua = ua_parse(ua_str or "")
-    if ua.is_bot:    return "Bot"
-    if ua.is_mobile: return "Mobile"
-    if ua.is_tablet: return "Tablet"
-    if ua.is_pc:     return "Desktop"
+UA_CACHE_SIZE = int(os.getenv("UA_CACHE_SIZE", "4096"))
+UA_MAX_LEN = 512
+# what ua-parser reports for an empty UA: family "Other" for both os and browser
+_UA_UNKNOWN = ("Other", "other", "0", "other", "0")
+_UA_BOT = ("Bot", "unknown", "0", "unknown", "0")
+
+_BOT_RE = re.compile(
+    r"bot|crawl|spider|slurp|facebookexternalhit|bingpreview|curl|wget|python-requests|httpclient|headless",
+    re.I,
+)
+_TABLET_HINTS = ("ipad", "tablet", "kindle", "nexus 7", "nexus 9", "nexus 10", "sm-t")
+_MOBILE_OS = {"ios", "android", "windows phone", "blackberry os", "kaios"}
+_DESKTOP_OS = {"windows", "mac os x", "linux", "ubuntu", "chrome os", "fedora", "debian", "freebsd"}
+
+def _device_family(dev: str, os_fam: str) -> str:
+    # classify from the already-parsed result instead of running a second parser
+    if dev == "spider":
+        return "Bot"
+    if any(h in dev for h in _TABLET_HINTS):
+        return "Tablet"
+    if os_fam in _MOBILE_OS or "mobile" in dev or "phone" in dev:
+        return "Mobile"
+    if os_fam in _DESKTOP_OS:
+        return "Desktop"
     return "Other"
 
-def _parse_ua(ua_str: str):
-    p = user_agent_parser.Parse(ua_str or "")
-    browser = (p["user_agent"]["family"] or "unknown").lower()
-    browser_major = p["user_agent"]["major"] or "0"
-    os_fam = (p["os"]["family"] or "unknown").lower()
-    os_major = p["os"]["major"] or "0"
-    dev = _device_family(ua_str or "")
+@lru_cache(maxsize=UA_CACHE_SIZE)
+def _parse_ua_cached(ua_str: str) -> Tuple[str, str, str, str, str]:
+    # ua_parser picks the native (ua-parser-rs) resolver when it is installed
+    p = ua_parser.parse(ua_str)
+    ua, os_, device = p.user_agent, p.os, p.device
+    browser = ((ua.family if ua else None) or "unknown").lower()
+    browser_major = (ua.major if ua else None) or "0"
+    os_fam = ((os_.family if os_ else None) or "unknown").lower()
+    os_major = (os_.major if os_ else None) or "0"
+    dev = _device_family(((device.family if device else None) or "").lower(), os_fam)
     return dev, os_fam, os_major, browser, browser_major
 
-_geo_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+def _parse_ua(ua_str: str) -> Tuple[str, str, str, str, str]:
+    # truncate so pathological headers can't blow up the cache keys
+    ua_str = (ua_str or "")[:UA_MAX_LEN].strip()
+    # nothing for the matchers to find; skip the resolver and the cache slot
+    if not ua_str or ua_str == "-":
+        return _UA_UNKNOWN
+    # known bots never need the full parse
+    if _BOT_RE.search(ua_str):
+        return _UA_BOT
+    return _parse_ua_cached(ua_str)
+
+_geo_cache: "TTLCache[str, Dict[str, Any]]" = TTLCache(maxsize=GEO_CACHE_MAX, ttl=GEO_CACHE_TTL)
+# IPs that recently failed/returned nothing, so we don't re-hit GEO_URL for them
+_geo_neg_cache: "TTLCache[str, bool]" = TTLCache(maxsize=GEO_CACHE_MAX, ttl=GEO_NEG_CACHE_TTL)
+_geo_cache_lock = threading.Lock()
+
 def _geo_cache_get(ip: str) -> Optional[Dict[str, Any]]:
-    now = time.time()
-    ent = _geo_cache.get(ip)
-    if not ent: return None
-    ts, val = ent
-    if now - ts > GEO_CACHE_TTL:
-        _geo_cache.pop(ip, None)
-        return None
-    return val
+    with _geo_cache_lock:
+        hit = _geo_cache.get(ip)
+        if hit is not None:
+            return hit
+        if ip in _geo_neg_cache:
+            return {}
+    return None
 
 def _geo_cache_put(ip: str, val: Dict[str, Any]) -> None:
-    _geo_cache[ip] = (time.time(), val)
+    with _geo_cache_lock:
+        if val:
+            _geo_cache[ip] = val
+        else:
+            _geo_neg_cache[ip] = True
 
+@lru_cache(maxsize=65536)
 def _is_public_ip(ip: str) -> bool:
     try:
         addr = ipaddress.ip_address(ip)
@@ -167,6 +256,11 @@ def _is_public_ip(ip: str) -> bool:
     except Exception:
         return False
 
+# keep-alive session shared by the geo workers; one pool slot per worker
+_GEO_SESSION = requests.Session()
+_GEO_SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=GEO_WORKERS))
+_GEO_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=GEO_WORKERS))
+
 def _geo_lookup(ip: str) -> Dict[str, Any]:
     """
     Returns a dict with keys:
@@ -181,7 +275,7 @@ def _geo_lookup(ip: str) -> Dict[str, Any]:
         return hit
 
     try:
-        r = requests.get(f"{GEO_URL}/lookup", params={"ip": ip}, timeout=GEO_TIMEOUT)
+        r = _GEO_SESSION.get(f"{GEO_URL}/lookup", params={"ip": ip}, timeout=GEO_TIMEOUT)
         if r.ok:
             data = r.json() or {}
             # normalize fields
@@ -200,6 +294,41 @@ def _geo_lookup(ip: str) -> Dict[str, Any]:
     except Exception:
         pass
 
+    _geo_cache_put(ip, {})
+    return {}
+
+_geo_executor = ThreadPoolExecutor(max_workers=GEO_WORKERS, thread_name_prefix="geo")
+_geo_pending: set = set()
+_geo_pending_lock = threading.Lock()
+
+def _geo_lookup_bg(ip: str) -> None:
+    try:
+        _geo_lookup(ip)
+    finally:
+        with _geo_pending_lock:
+            _geo_pending.discard(ip)
+
+def _geo_lookup_nowait(ip: str) -> Dict[str, Any]:
+    """
+    Non-blocking variant for the request path: returns whatever is cached
+    and, on a miss, schedules a background lookup that fills the cache.
+    """
+    if not ip or not _is_public_ip(ip):
+        return {}
+    hit = _geo_cache_get(ip)
+    if hit is not None:
+        return hit
+    with _geo_pending_lock:
+        # every queued/running lookup is in _geo_pending, so this also bounds the executor queue;
+        # when the geo service falls behind, new IPs go unenriched until it catches up
+        if ip in _geo_pending or len(_geo_pending) >= GEO_PENDING_MAX:
+            return {}
+        _geo_pending.add(ip)
+    try:
+        _geo_executor.submit(_geo_lookup_bg, ip)
+    except Exception:
+        with _geo_pending_lock:
+            _geo_pending.discard(ip)
     return {}
 
 
@@ -210,7 +339,53 @@ def add_security_headers(resp):
     resp.headers["X-Content-Type-Options"] = "nosniff"
     resp.headers["X-Frame-Options"] = "DENY"
     resp.headers["Referrer-Policy"] = "no-referrer"
-    resp.headers["Cache-Control"] = "no-store"
+    # ETag'd responses set no-cache (revalidate); everything else stays uncacheable
+    resp.headers.setdefault("Cache-Control", "no-store")
+    return resp
+
+# -------------------- Compression --------------------
+def _accepts_gzip() -> bool:
+    return request.accept_encodings["gzip"] > 0
+
+def _gz_etag(etag: str) -> str:
+    # a strong ETag must differ between the identity and the gzip representation (RFC 9110 8.8.3)
+    return etag[:-1] + '-gz"'
+
+def _gzip_stream(chunks):
+    z = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    try:
+        for chunk in chunks:
+            out = z.compress(chunk)
+            if out:
+                yield out
+        yield z.flush()
+    finally:
+        # release the inner generator (and its pooled connection) on early disconnect
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+
+@app.after_request
+def _compress_json(resp):
+    if (resp.status_code != 200 or resp.mimetype != "application/json"
+            or resp.direct_passthrough or "Content-Encoding" in resp.headers):
+        return resp
+    resp.vary.add("Accept-Encoding")
+    if not _accepts_gzip():
+        return resp
+    if resp.is_streamed:
+        # named-cursor streams: compress chunk by chunk, never buffer the whole body
+        resp.response = _gzip_stream(resp.response)
+        resp.headers.pop("Content-Length", None)
+    else:
+        body = resp.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return resp
+        resp.set_data(gzip.compress(body, COMPRESS_LEVEL))
+    resp.headers["Content-Encoding"] = "gzip"
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.headers["ETag"] = _gz_etag(resp.headers["ETag"])
     return resp
 
 # -------------------- Prometheus metrics --------------------
@@ -250,6 +425,11 @@ DB_POOL_AVAILABLE = Gauge(
     "Connections currently available in pool",
     registry=registry,
 )
+DB_POOL_RECOMMENDED = Gauge(
+    "db_pool_recommended_connections",
+    "Recommended pool size derived from DB_CORES ((cores*2)+1)",
+    registry=registry,
+)
 DB_POOL_INUSE = Gauge(
     "db_pool_inuse_connections",
     "Connections currently in use",
@@ -281,6 +461,12 @@ def _endpoint_label():
         return request.url_rule.rule
     return request.path or "unknown"
 
+@lru_cache(maxsize=1024)
+def _request_metrics(method: str, endpoint: str, status: str):
+    # labels() validates and looks up the child under the metric's lock on every call; the
+    # set of (method, route, status) triples is small, so resolve each pair of children once
+    return REQ_LATENCY.labels(method, endpoint), REQUESTS.labels(method, endpoint, status)
+
 @app.before_request
 def _api_token_gate():
     # Let probes/metrics through, and keep OPTIONS preflights harmless.
@@ -293,10 +479,22 @@ def _api_token_gate():
         abort(401, description="Missing or Invalid API token")
 
 
+# request-id fallback: a per-process counter instead of an os.urandom() call per request
+_REQ_ID_MASK = (1 << 48) - 1
+_REQ_ID_CTR = itertools.count(int.from_bytes(os.urandom(6), "big"))
+
+def _reseed_request_ids():
+    global _REQ_ID_CTR
+    _REQ_ID_CTR = itertools.count(int.from_bytes(os.urandom(6), "big"))
+
+# keep ids distinct across gunicorn workers even when the app is preloaded
+os.register_at_fork(after_in_child=_reseed_request_ids)
+
 @app.before_request
 def _start_timer_and_request_id():
     g.start_time = time.time()
-    g.request_id = request.headers.get("X-Request-ID") or request.headers.get("X-Cf-Ray") or os.urandom(6).hex()
+    g.request_id = request.headers.get("X-Request-ID") or request.headers.get("X-Cf-Ray") \
+        or format(next(_REQ_ID_CTR) & _REQ_ID_MASK, "012x")
     g.request_path = request.path
     g.request_method = request.method
     INFLIGHT.inc()
@@ -310,9 +508,10 @@ def _visit_enrich_and_count():
                     or request.headers.get("X-Forwarded-For","").split(",")[0].strip() \
                     or request.remote_addr
 
-        # Prefer Cloudflare’s country for speed; we’ll still enrich from local geo for city/ASN/etc
+        # Prefer Cloudflare’s country for speed; city/ASN/etc come from the geo cache,
+        # which is filled in the background so a cold IP never blocks the request
         cf_country = (request.headers.get("CF-IPCountry") or "").strip().upper()
-        geo = _geo_lookup(client_ip) if _is_public_ip(client_ip) else {}
+        geo = _geo_lookup_nowait(client_ip)
 
         # Choose ISO2 country code: geo > CF > UNKNOWN
         country = (geo.get("country_iso2") or cf_country or "UNKNOWN").upper()
@@ -352,13 +551,54 @@ def _visit_enrich_and_count():
         pass
 
 
+# -------------------- Visit log writer --------------------
+VISIT_Q: "queue.Queue[bytes]" = queue.Queue(maxsize=VISIT_Q_MAX)
+
+def _visit_log_put(line: bytes) -> None:
+    # never block the request thread; drop the oldest line when full
+    try:
+        VISIT_Q.put_nowait(line)
+    except queue.Full:
+        try:
+            VISIT_Q.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            VISIT_Q.put_nowait(line)
+        except queue.Full:
+            pass
+
+def _visit_log_writer_loop():
+    while True:
+        try:
+            batch = [VISIT_Q.get()]
+            deadline = time.monotonic() + VISIT_FLUSH_INTERVAL
+            while len(batch) < VISIT_FLUSH_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(VISIT_Q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            sys.stdout.write(b"\n".join(batch).decode() + "\n")
+            sys.stdout.flush()
+        except Exception:
+            pass
+
 @app.after_request
 def _record_metrics_and_log(resp):
     try:
         duration = max(time.time() - getattr(g, "start_time", time.time()), 0)
         endpoint = _endpoint_label()
-        REQ_LATENCY.labels(request.method, endpoint).observe(duration)
-        REQUESTS.labels(request.method, endpoint, str(resp.status_code)).inc()
+        if request.url_rule is not None:
+            latency, count = _request_metrics(request.method, endpoint, str(resp.status_code))
+        else:
+            # unmatched paths (404s) are unbounded: keep them out of the cache
+            latency = REQ_LATENCY.labels(request.method, endpoint)
+            count = REQUESTS.labels(request.method, endpoint, str(resp.status_code))
+        latency.observe(duration)
+        count.inc()
         g.response_status = resp.status_code
         # basic access log
         logger.info(f"{request.method} {request.path} -> {resp.status_code} in {duration:.4f}s")
@@ -374,7 +614,7 @@ def _record_metrics_and_log(resp):
             v["event"] = "visit"
             # Emit a clean JSON line alongside your structured logs.
             # (We keep IP only in logs; never in Prometheus labels.)
-            print(json.dumps(v, ensure_ascii=False), flush=True)
+            _visit_log_put(orjson.dumps(v))
     except Exception:
         pass
     return resp
@@ -388,29 +628,44 @@ def metrics():
 def _export_pool_metrics():
     # not exact, but good visibility
     try:
-        DB_POOL_AVAILABLE.set(POOL._pool.qsize())
         if POOL is None:
             DB_POOL_AVAILABLE.set(0)
             DB_POOL_INUSE.set(0)
             return
-        DB_POOL_AVAILABLE.set(POOL._pool.qsize())
-        # in-use = maxconn - available (approx; psycopg2 SimpleConnectionPool has _pool and _used)
-        inuse = len(getattr(POOL, "_used", {}))
-        DB_POOL_INUSE.set(inuse)
+        # ThreadedConnectionPool keeps idle conns in _pool (list) and checked-out ones in _used
+        DB_POOL_AVAILABLE.set(len(POOL._pool))
+        DB_POOL_INUSE.set(len(POOL._used))
     except Exception:
         pass
 
+def _pool_metrics_loop():
+    while True:
+        _export_pool_metrics()
+        sleep(POOL_METRICS_INTERVAL)
+
 def _ensure_pool():
     """Initialize the pool once with small retry/backoff."""
-    global POOL
+    global POOL, POOL_MIN, POOL_MAX, POOL_SEM
     if POOL is not None:
         return
     with POOL_LOCK:
         if POOL is not None:
             return
+        DB_POOL_RECOMMENDED.set(POOL_RECOMMENDED)
+        if POOL_MAX > POOL_RECOMMENDED * 2:
+            logger.warning("DB_POOL_MAX=%d exceeds 2x recommended pool size %d (DB_CORES=%d); clamping",
+                           POOL_MAX, POOL_RECOMMENDED, DB_CORES)
+            POOL_MAX = POOL_RECOMMENDED * 2
+        if DB_MAX_CONNECTIONS > 0:
+            ceiling = max(1, DB_MAX_CONNECTIONS // max(1, API_WORKERS * API_REPLICAS))
+            if POOL_MAX > ceiling:
+                logger.warning("DB_POOL_MAX=%d exceeds DB_MAX_CONNECTIONS=%d split over %d workers x %d replicas; clamping to %d",
+                               POOL_MAX, DB_MAX_CONNECTIONS, API_WORKERS, API_REPLICAS, ceiling)
+                POOL_MAX = ceiling
+        POOL_MIN = min(POOL_MIN, POOL_MAX)
         for attempt in range(1, 31):  # ~60s total
             try:
-                p = SimpleConnectionPool(
+                p = ThreadedConnectionPool(
                     POOL_MIN,
                     POOL_MAX,
                     host=DB_HOST,
@@ -422,76 +677,299 @@ def _ensure_pool():
                     application_name="epl_api",
                 )
                 # quick sanity check
-                with p.getconn() as c:
+                c = p.getconn()
+                try:
                     with c.cursor() as cur:
                         cur.execute("SELECT 1;")
+                    c.rollback()
+                finally:
+                    p.putconn(c)
+                POOL_SEM = threading.BoundedSemaphore(POOL_MAX)
                 POOL = p
                 logger.info("DB pool initialized")
-                _export_pool_metrics()
+                threading.Thread(target=_pool_metrics_loop, name="db-pool-metrics", daemon=True).start()
                 return
             except Exception as e:
                 logger.warning("DB pool init attempt %d/30 failed: %s", attempt, e)
                 time.sleep(2)
         logger.error("DB pool could not be initialized after retries")
 
+_conn_last_used: Dict[int, float] = {}
+
+def _checkout():
+    # pre-ping connections that sat idle long enough for PgBouncer/Postgres to drop them
+    for _ in range(2):
+        conn = POOL.getconn()
+        last = _conn_last_used.get(id(conn))
+        if last is None or time.monotonic() - last < POOL_PING_IDLE:
+            return conn
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return conn
+        except psycopg2.Error:
+            _conn_last_used.pop(id(conn), None)
+            POOL.putconn(conn, close=True)
+    return POOL.getconn()
+
 class ConnCtx:
     def __enter__(self):
         _ensure_pool()
         if POOL is None:
             # readiness will fail with 503; liveness (/health) stays OK
             raise RuntimeError("DB unavailable")
-        self.conn = POOL.getconn()
-        _export_pool_metrics()
+        if not POOL_SEM.acquire(timeout=POOL_TIMEOUT):
+            raise RuntimeError("DB pool exhausted")
+        try:
+            self.conn = _checkout()
+        except Exception:
+            POOL_SEM.release()
+            raise
         return self.conn
 
     def __exit__(self, exc_type, exc, tb):
+        broken = isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError))
         try:
             if exc:
                 self.conn.rollback()
             else:
                 self.conn.commit()
+        except psycopg2.Error:
+            broken = True
+            raise
         finally:
-            POOL.putconn(self.conn)
-            _export_pool_metrics()
+            broken = broken or bool(self.conn.closed)
+            if broken:
+                _conn_last_used.pop(id(self.conn), None)
+            else:
+                _conn_last_used[id(self.conn)] = time.monotonic()
+            POOL.putconn(self.conn, close=broken)
+            POOL_SEM.release()
 
 def _to_jsonable(v):
-    if isinstance(v, (datetime, date, dtime)):
-        return v.isoformat()
+    # orjson default hook: it already encodes datetime/date/time/UUID natively
     if isinstance(v, Decimal):
         return float(v)
+    if isinstance(v, (datetime, date, dtime)):
+        return v.isoformat()
     if isinstance(v, UUID):
         return str(v)
-    return v
+    raise TypeError(f"Type is not JSON serializable: {type(v).__name__}")
+
+ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+class OrjsonProvider(JSONProvider):
+    """Route Flask's jsonify()/list returns through orjson as well."""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_to_jsonable, option=ORJSON_OPTS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+app.json = OrjsonProvider(app)
 
 def jsonify_records(records):
-    return jsonify([{k: _to_jsonable(v) for k, v in rec.items()} for rec in records])
+    return Response(orjson.dumps(records, default=_to_jsonable, option=ORJSON_OPTS),
+                    mimetype="application/json")
+
+def fetchall_records(cur) -> List[Dict[str, Any]]:
+    # plain tuple cursor: read column names once instead of building a RealDictRow per row
+    cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+def jsonify_cursor(cur):
+    return jsonify_records(fetchall_records(cur))
+
+def _json_agg_sql(sql: str) -> str:
+    # Postgres builds the JSON array; the driver hands back a single text value
+    return f"SELECT COALESCE(json_agg(t), '[]'::json)::text FROM ({sql}) t"
+
+def jsonify_json_query(cur, stmt: str, params: Optional[Tuple[Any, ...]] = None):
+    """Run a statement that already yields one JSON text value (see _json_agg_sql)."""
+    cur.execute(stmt, params)
+    return Response(cur.fetchone()[0], mimetype="application/json")
+
+def jsonify_query(cur, sql: str, params: Optional[Tuple[Any, ...]] = None):
+    return jsonify_json_query(cur, _json_agg_sql(sql), params)
+
+def _drop_key(obj: Any, key: str) -> Any:
+    if isinstance(obj, dict):
+        return {k: _drop_key(v, key) for k, v in obj.items() if k != key}
+    if isinstance(obj, list):
+        return [_drop_key(v, key) for v in obj]
+    return obj
+
+def jsonify_query_without(cur, sql: str, params: Optional[Tuple[Any, ...]], key: str):
+    """jsonify_query minus `key` at any depth: for functions that serialize whole table rows."""
+    cur.execute(_json_agg_sql(sql), params)
+    return jsonify_records(_drop_key(orjson.loads(cur.fetchone()[0]), key))
+
+def stream_query(sql: str, params: Tuple[Any, ...] = ()):
+    """
+    Stream a JSON array from a server-side (named) cursor, STREAM_ITERSIZE rows
+    at a time. Checkout and execute happen before the Response is returned, so pool
+    exhaustion / DB errors still reach the 503/500 handlers; only the fetch loop is
+    streamed, and the connection stays checked out until the body is fully sent.
+    """
+    ctx = ConnCtx()
+    conn = ctx.__enter__()
+    try:
+        cur = conn.cursor(name=f"stream_{uuid4().hex}")
+        cur.execute(sql, params)
+    except BaseException:
+        ctx.__exit__(*sys.exc_info())
+        raise
+
+    released = False
+    def release(exc_info=(None, None, None)):
+        nonlocal released
+        if released:
+            return
+        released = True
+        try:
+            cur.close()
+        except psycopg2.Error:
+            pass
+        ctx.__exit__(*exc_info)
+
+    def generate():
+        try:
+            cols = [d[0] for d in cur.description]
+            sep = b"["
+            while True:
+                rows = cur.fetchmany(STREAM_ITERSIZE)
+                if not rows:
+                    break
+                chunk = orjson.dumps([dict(zip(cols, row)) for row in rows], default=_to_jsonable, option=ORJSON_OPTS)
+                yield sep + chunk[1:-1]
+                sep = b","
+            yield b"[]" if sep == b"[" else b"]"
+        except BaseException:
+            release(sys.exc_info())
+            raise
+        finally:
+            release()
+
+    resp = Response(generate(), mimetype="application/json")
+    resp.call_on_close(release)  # body never iterated (e.g. HEAD / client gone early)
+    return resp
 
-def _pagination():
+# -------------------- Response cache --------------------
+# path+query -> (etag, mimetype, body, gzipped body or None); serialized and compressed once on insert
+_response_cache: "TTLCache[str, Tuple[str, str, bytes, Optional[bytes]]]" = TTLCache(maxsize=RESPONSE_CACHE_MAX, ttl=RESPONSE_CACHE_TTL)
+_response_cache_lock = threading.Lock()
+
+# clients may store ETag'd bodies but must revalidate (If-None-Match) before each reuse
+REVALIDATE = "no-cache"
+
+def _cached_or_304(entry: Tuple[str, str, bytes, Optional[bytes]]):
+    etag, mimetype, body, gz = entry
+    use_gz = gz is not None and _accepts_gzip()
+    if use_gz:
+        etag = _gz_etag(etag)
+    if request.if_none_match.contains_raw(etag):
+        return Response(status=304, headers={"ETag": etag, "Cache-Control": REVALIDATE, "Vary": "Accept-Encoding"})
+    if use_gz:
+        return Response(gz, mimetype=mimetype,
+                        headers={"ETag": etag, "Cache-Control": REVALIDATE,
+                                 "Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+    return Response(body, mimetype=mimetype,
+                    headers={"ETag": etag, "Cache-Control": REVALIDATE, "Vary": "Accept-Encoding"})
+
+def cached_response(fn):
+    """Cache successful GET bodies for RESPONSE_CACHE_TTL seconds and honor If-None-Match."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.full_path
+        with _response_cache_lock:
+            entry = _response_cache.get(key)
+        if entry is not None:
+            return _cached_or_304(entry)
+        resp = app.make_response(fn(*args, **kwargs))
+        if resp.status_code != 200 or resp.is_streamed:
+            return resp
+        body = resp.get_data()
+        gz = gzip.compress(body, COMPRESS_LEVEL) if len(body) >= COMPRESS_MIN_SIZE else None
+        entry = (f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"', resp.mimetype, body, gz)
+        with _response_cache_lock:
+            _response_cache[key] = entry
+        return _cached_or_304(entry)
+    return wrapper
+
+def _invalidate_response_cache() -> None:
+    with _response_cache_lock:
+        _response_cache.clear()
+
+def _pagination(default: int = DEFAULT_LIMIT, maximum: int = MAX_LIMIT):
     try:
-        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+        limit = int(request.args.get("limit", default))
         offset = int(request.args.get("offset", 0))
     except ValueError:
         abort(400, description="limit and offset must be integers")
-    limit = max(1, min(limit, MAX_LIMIT))
+    limit = max(1, min(limit, maximum))
     offset = max(0, offset)
     return limit, offset
 
+def _fpl_elements_page(matched: bool):
+    """
+    Page fpl_elements_enriched by id. ?after_id= (keyset) takes precedence over ?offset=;
+    the default page covers a whole season's player list, so unpaged callers still get everything.
+    """
+    limit, offset = _pagination(FPL_DEFAULT_LIMIT, FPL_MAX_LIMIT)
+    op = "!=" if matched else "="
+    after_id = request.args.get("after_id")
+    with ConnCtx() as conn, conn.cursor() as cur:
+        if after_id is not None:
+            try:
+                after_id = int(after_id)
+            except ValueError:
+                abort(400, description="after_id must be an integer")
+            return jsonify_query(cur, f"""
+                    SELECT * FROM fpl_elements_enriched
+                    WHERE match_method {op} 'none' AND id > %s
+                    ORDER BY id LIMIT %s
+                    """, (after_id, limit))
+        return jsonify_query(cur, f"""
+                    SELECT * FROM fpl_elements_enriched
+                    WHERE match_method {op} 'none'
+                    ORDER BY id LIMIT %s OFFSET %s
+                    """, (limit, offset))
+
 def _safe_ident(name: str) -> str:
     if not name or not IDENTIFIER_RE.match(name):
         abort(400, description="Invalid identifier")
     return name
 
-def _check_team_table(name: str) -> str:
-    name = _safe_ident(name)
-    if name not in ALLOWED_TEAM_TABLES:
+# table -> (by-team statement, paginated statement), already wrapped in json_agg
+_TEAM_TABLE_SQL: Dict[str, Tuple[str, str]] = {
+    t: (_json_agg_sql(f'SELECT * FROM {t} WHERE "team_name" = %s'),
+        _json_agg_sql(f'SELECT * FROM {t} ORDER BY 1 ASC LIMIT %s OFFSET %s'))
+    for t in ALLOWED_TEAM_TABLES
+}
+
+def _check_team_table(name: str) -> Tuple[str, str]:
+    stmts = _TEAM_TABLE_SQL.get(name)
+    if stmts is None:
+        name = _safe_ident(name)
         abort(404, description=f"Unknown table '{name}'")
-    return name
+    return stmts
 
 # -------------------- Weekly Table (single league/season) --------------------
 WEEKLY_TABLE: Dict[str, Any] = {}
 WEEKLY_TABLE_LAST_BUILT: Optional[datetime] = None
 WEEKLY_TABLE_LOCK = threading.Lock()
+# serialized once per rebuild; the GET endpoint serves these bytes as-is
+WEEKLY_TABLE_JSON: Optional[bytes] = None
+WEEKLY_TABLE_ETAG: Optional[str] = None
 WEEKLY_REFRESH_INTERVAL_SECONDS = 7 * 24 * 60 * 60  # once a week
+# pg advisory lock key: only one API worker refreshes the weekly_table view at a time
+WEEKLY_TABLE_ADVISORY_KEY = 0x57544142  # "WTAB"
+WEEKLY_RETRY_BASE_SECONDS = float(os.getenv("WEEKLY_RETRY_BASE_SECONDS", "30"))
+WEEKLY_RETRY_MAX_SECONDS = float(os.getenv("WEEKLY_RETRY_MAX_SECONDS", "3600"))
+# single-flight: concurrent rebuild callers share the one in progress
+_WEEKLY_REBUILD_LOCK = threading.Lock()
+_weekly_rebuild_inflight: Optional[Future] = None
 
 def _to_int(v: Any, default: Optional[int] = 0) -> int:
     try:
@@ -518,69 +996,136 @@ def _build_weekly_table_from_rows(rows: Iterable[Dict[str, Any]]) -> Dict[str, A
     rows.sort(key=lambda r: (_parse_dt(r.get("date_utc")), _to_int(r.get("match_id"), 0)))
 
     teams = sorted({str(r["team_h"]) for r in rows} | {str(r["team_a"]) for r in rows})
-    contrib: Dict[str, List[Dict[str, int]]] = {t: [] for t in teams}
-
-    def add_game(home: str, away: str, hg: int, ag: int):
-        if hg > ag:
-            hpts, apts = 3, 0
-        elif hg < ag:
-            hpts, apts = 0, 3
-        else:
-            hpts, apts = 1, 1
-        contrib[home].append({"pts": hpts, "gf": hg, "ga": ag})
-        contrib[away].append({"pts": apts, "gf": ag, "ga": hg})
+    team_idx = {t: i for i, t in enumerate(teams)}
+    # per-team (pts, gf, ga) in match order
+    contrib: List[List[Tuple[int, int, int]]] = [[] for _ in teams]
 
     for r in rows:
-        add_game(str(r["team_h"]), str(r["team_a"]), _to_int(r["home_goals"], 0), _to_int(r["away_goals"], 0))
+        h, a = team_idx[str(r["team_h"])], team_idx[str(r["team_a"])]
+        hg, ag = _to_int(r["home_goals"], 0), _to_int(r["away_goals"], 0)
+        hpts, apts = (3, 0) if hg > ag else (0, 3) if hg < ag else (1, 1)
+        contrib[h].append((hpts, hg, ag))
+        contrib[a].append((apts, ag, hg))
 
-    counts = [len(contrib[t]) for t in teams]
-    if not counts:
-        return {"weeks": [], "teams": [], "long": []}
-    R = min(counts)
+    R = min(len(c) for c in contrib)
     if R <= 0:
         return {"weeks": [], "teams": [{"team": t, "pos": []} for t in teams], "long": []}
 
-    def rank(agg: Dict[str, Dict[str, int]]) -> List[str]:
-        def key_fn(t: str) -> Tuple[int, int, int, str]:
-            pts = agg[t]["pts"]; gd = agg[t]["gf"] - agg[t]["ga"]; gf = agg[t]["gf"]
-            return (-pts, -gd, -gf, t)
-        return sorted(teams, key=key_fn)
-
-    positions_by_team = {t: [] for t in teams}
-    long_rows: List[Dict[str, Any]] = []
-
-    for k in range(1, R + 1):
-        totals = {t: {"pts": sum(x["pts"] for x in contrib[t][:k]),
-                      "gf": sum(x["gf"] for x in contrib[t][:k]),
-                      "ga": sum(x["ga"] for x in contrib[t][:k])} for t in teams}
-        order = rank(totals)
-        pos = {t: i + 1 for i, t in enumerate(order)}
-        for t in teams:
-            positions_by_team[t].append(pos[t])
-            long_rows.append({"team": t, "week": k, "pos": pos[t]})
+    # (T, R, 3) -> running totals per team per week
+    games = np.array([c[:R] for c in contrib], dtype=np.int32)
+    totals = games.cumsum(axis=1)
+    cpts, cgf, cga = totals[:, :, 0], totals[:, :, 1], totals[:, :, 2]
+    cgd = cgf - cga
+
+    # rank by pts, gd, gf desc; ties broken by team name (teams is sorted, so index order)
+    T = len(teams)
+    name_key = np.arange(T)
+    ranks = np.arange(1, T + 1)
+    positions = np.empty((T, R), dtype=np.int32)
+    for k in range(R):
+        order = np.lexsort((name_key, -cgf[:, k], -cgd[:, k], -cpts[:, k]))
+        positions[order, k] = ranks
+
+    pos_lists = positions.tolist()
+    long_rows: List[Dict[str, Any]] = [
+        {"team": t, "week": k + 1, "pos": pos_lists[i][k]}
+        for k in range(R) for i, t in enumerate(teams)
+    ]
 
     return {"weeks": list(range(1, R + 1)),
-            "teams": [{"team": t, "pos": positions_by_team[t]} for t in teams],
+            "teams": [{"team": t, "pos": pos_lists[i]} for i, t in enumerate(teams)],
             "long": long_rows}
 
 def rebuild_weekly_table() -> Dict[str, Any]:
-    logger.info("Rebuilding weekly table from match_info …")
+    global _weekly_rebuild_inflight
+    with _WEEKLY_REBUILD_LOCK:
+        fut = _weekly_rebuild_inflight
+        leader = fut is None
+        if leader:
+            fut = _weekly_rebuild_inflight = Future()
+    if not leader:
+        logger.info("Weekly table rebuild already running; waiting for it")
+        return fut.result()
+
+    try:
+        fut.set_result(_rebuild_weekly_table())
+    except BaseException as e:
+        fut.set_exception(e)
+    finally:
+        with _WEEKLY_REBUILD_LOCK:
+            _weekly_rebuild_inflight = None
+    return fut.result()
+
+def _weekly_table_from_positions(rows: Iterable[Tuple[str, int, int]]) -> Dict[str, Any]:
+    """(team, week, pos) rows from the weekly_table view -> same shape as _build_weekly_table_from_rows."""
+    rows = list(rows)
+    if not rows:
+        return {"weeks": [], "teams": [], "long": []}
+    teams = sorted({t for t, _, _ in rows})
+    R = max(w for _, w, _ in rows)
+    pos = {t: [0] * R for t in teams}
+    for t, w, p in rows:
+        pos[t][w - 1] = p
+    return {"weeks": list(range(1, R + 1)),
+            "teams": [{"team": t, "pos": pos[t]} for t in teams],
+            "long": [{"team": t, "week": k + 1, "pos": pos[t][k]} for k in range(R) for t in teams]}
+
+def _refresh_and_read_weekly_view(conn) -> Optional[List[Tuple[str, int, int]]]:
+    """
+    REFRESH ... CONCURRENTLY the weekly_table materialized view (installed by the data
+    pipeline) and read it back. Returns None when the view does not exist yet.
+    """
+    with conn.cursor() as cur:
+        try:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (WEEKLY_TABLE_ADVISORY_KEY,))
+            if cur.fetchone()[0]:
+                cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY weekly_table")
+            conn.commit()
+        except pg_errors.UndefinedTable:
+            conn.rollback()
+            return None
+        except (pg_errors.InsufficientPrivilege, pg_errors.ObjectNotInPrerequisiteState):
+            # not the owner, or the view is unpopulated: serve what is there
+            conn.rollback()
+            logger.warning("weekly_table refresh skipped", exc_info=True)
+        try:
+            cur.execute('SELECT team, week, pos FROM weekly_table ORDER BY week, team COLLATE "C"')
+            return cur.fetchall()
+        except pg_errors.UndefinedTable:
+            # dropped between the refresh and the read (e.g. a pipeline reinstall)
+            conn.rollback()
+            return None
+
+def _rebuild_weekly_table() -> Dict[str, Any]:
+    logger.info("Rebuilding weekly table …")
     start = time.time()
     try:
-        with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT match_id, date_utc, team_h, team_a, home_goals, away_goals
-                FROM match_info
-                ORDER BY date_utc ASC, match_id ASC
-            """)
-            all_rows = cur.fetchall()
-
-        data = _build_weekly_table_from_rows(all_rows)
+        with ConnCtx() as conn:
+            positions = _refresh_and_read_weekly_view(conn)
+            if positions is None:
+                # view not installed yet: compute from match_info in process
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute("""
+                        SELECT match_id, date_utc, team_h, team_a, home_goals, away_goals
+                        FROM match_info
+                        ORDER BY date_utc ASC, match_id ASC
+                    """)
+                    all_rows = cur.fetchall()
+
+        if positions is not None:
+            data = _weekly_table_from_positions(positions)
+        else:
+            data = _build_weekly_table_from_rows(all_rows)
+        built = datetime.now(timezone.utc)
+        payload = orjson.dumps({"last_built": built.isoformat(), "data": data})
         with WEEKLY_TABLE_LOCK:
             WEEKLY_TABLE.clear()
             WEEKLY_TABLE.update(data)
-            global WEEKLY_TABLE_LAST_BUILT
-            WEEKLY_TABLE_LAST_BUILT = datetime.now(timezone.utc)
+            global WEEKLY_TABLE_LAST_BUILT, WEEKLY_TABLE_JSON, WEEKLY_TABLE_ETAG
+            WEEKLY_TABLE_LAST_BUILT = built
+            WEEKLY_TABLE_JSON = payload
+            WEEKLY_TABLE_ETAG = f'"wt-{int(built.timestamp() * 1000)}"'
+        _invalidate_response_cache()
 
         REBUILD_COUNT.labels("success").inc()
         duration = time.time() - start
@@ -598,12 +1143,18 @@ def rebuild_weekly_table() -> Dict[str, Any]:
         raise
 
 def _weekly_refresh_loop():
+    delay, failures = WEEKLY_REFRESH_INTERVAL_SECONDS, 0
     while True:
+        sleep(delay)
         try:
-            sleep(WEEKLY_REFRESH_INTERVAL_SECONDS)
             rebuild_weekly_table()
+            delay, failures = WEEKLY_REFRESH_INTERVAL_SECONDS, 0
         except Exception:
-            logger.exception("Weekly refresh loop failed; will retry after interval")
+            # exponential backoff with full jitter, capped; back to weekly once it succeeds
+            failures += 1
+            cap = min(WEEKLY_RETRY_MAX_SECONDS, WEEKLY_RETRY_BASE_SECONDS * (2 ** min(failures, 16)))
+            delay = random.uniform(WEEKLY_RETRY_BASE_SECONDS, max(WEEKLY_RETRY_BASE_SECONDS, cap))
+            logger.exception("Weekly refresh loop failed (%d in a row); retrying in %.0fs", failures, delay)
 
 # -------------------- Health --------------------
 @app.route("/health", methods=["GET"])
@@ -625,169 +1176,160 @@ def readyz():
 @app.route("/<string:team>/squad", methods=["GET"])
 def squad(team):
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("""SELECT * FROM players WHERE "team_title" = %s ORDER BY id ASC LIMIT %s OFFSET %s""",
-                    (team, limit, offset))
-        return jsonify_records(cur.fetchall())
+    return stream_query("""SELECT * FROM players WHERE "team_title" = %s ORDER BY id ASC LIMIT %s OFFSET %s""",
+                        (team, limit, offset))
 
 @app.route("/standings", methods=["GET"])
 def standings():
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute('SELECT * FROM standings LIMIT %s OFFSET %s', (limit, offset))
-        return jsonify_records(cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, 'SELECT * FROM standings LIMIT %s OFFSET %s', (limit, offset))
 
 @app.route("/standings/<string:team>", methods=["GET"])
 def standings_team(team):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with ConnCtx() as conn, conn.cursor() as cur:
         cur.execute('SELECT * FROM standings WHERE "Team" = %s', (team,))
-        return jsonify_records(cur.fetchall())
+        return jsonify_cursor(cur)
 
 @app.route("/teams/names", methods=["GET"])
 def get_team_names():
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with ConnCtx() as conn, conn.cursor() as cur:
         cur.execute('SELECT team_name FROM epl_teams ORDER BY team_name ASC;')
-        return jsonify_records(cur.fetchall())
+        return jsonify_cursor(cur)
 
 @app.route("/teams", methods=["GET"])
 def epl_teams():
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute('SELECT * FROM epl_teams ORDER BY team_name ASC LIMIT %s OFFSET %s;', (limit, offset))
-        return jsonify_records(cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, 'SELECT * FROM epl_teams ORDER BY team_name ASC LIMIT %s OFFSET %s',
+                             (limit, offset))
 
 @app.route("/chances_created/<string:team>", methods=["GET"])
 def chance_created(team):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with ConnCtx() as conn, conn.cursor() as cur:
         cur.execute('SELECT * FROM team_chances_created WHERE "team_name" = %s', (team,))
-        return jsonify_records(cur.fetchall())
+        return jsonify_cursor(cur)
 
 @app.route("/chances_conceded/<string:team>", methods=["GET"])
 def chance_conceded(team):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with ConnCtx() as conn, conn.cursor() as cur:
         cur.execute('SELECT * FROM team_chances_conceded WHERE "team_name" = %s', (team,))
-        return jsonify_records(cur.fetchall())
+        return jsonify_cursor(cur)
 
 @app.route("/formation/<string:team>", methods=["GET"])
 def team_formation(team):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with ConnCtx() as conn, conn.cursor() as cur:
         cur.execute('SELECT * FROM formations WHERE "team_name" = %s', (team,))
-        return jsonify_records(cur.fetchall())
+        return jsonify_cursor(cur)
 
 @app.route("/fixtures", methods=["GET"])
 def fixtures():
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute('SELECT * FROM fixtures ORDER BY id ASC LIMIT %s OFFSET %s;', (limit, offset))
-        return jsonify_records(cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, 'SELECT * FROM fixtures ORDER BY id ASC LIMIT %s OFFSET %s', (limit, offset))
 
 @app.route("/fixtures/<string:match_id>", methods=["GET"])
 def fixtures_match_id(match_id):
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with ConnCtx() as conn, conn.cursor() as cur:
         cur.execute('SELECT * FROM fixtures WHERE id = %s LIMIT %s OFFSET %s;', (match_id, limit, offset))
-        return jsonify_records(cur.fetchall())
+        return jsonify_cursor(cur)
 
 @app.route("/fixtures/upcoming", methods=["GET"])
 def upcoming_fixtures():
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute('''SELECT * FROM fixtures WHERE "isResult" IS NOT TRUE ORDER BY id ASC LIMIT %s OFFSET %s''',
-                    (limit, offset))
-        return jsonify_records(cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, '''
+            SELECT * FROM fixtures WHERE "isResult" IS NOT TRUE ORDER BY id ASC LIMIT %s OFFSET %s
+        ''', (limit, offset))
 
 @app.route("/fixtures/upcoming/<string:team>", methods=["GET"])
 def upcoming_team_fixtures(team):
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute('''
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, '''
             SELECT * FROM fixtures
             WHERE "isResult" IS NOT TRUE
               AND ("home_team" = %s OR "away_team" = %s)
             ORDER BY id ASC
             LIMIT %s OFFSET %s
         ''', (team, team, limit, offset))
-        return jsonify_records(cur.fetchall())
 
 @app.route("/fixtures/<string:team>", methods=["GET"])
 def team_fixtures(team):
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            'SELECT * FROM fixtures WHERE "home_team" = %s OR "away_team" = %s ORDER BY id ASC LIMIT %s OFFSET %s;',
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(
+            cur,
+            'SELECT * FROM fixtures WHERE "home_team" = %s OR "away_team" = %s ORDER BY id ASC LIMIT %s OFFSET %s',
             (team, team, limit, offset),
         )
-        return jsonify_records(cur.fetchall())
 
 @app.route("/recents", methods=["GET"])
 def recent_results():
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute('''
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, '''
             SELECT * FROM fixtures WHERE "isResult" IS TRUE ORDER BY id DESC LIMIT %s OFFSET %s
         ''', (limit, offset))
-        return jsonify_records(cur.fetchall())
 
 @app.route("/recents/<string:team>", methods=["GET"])
 def recent_results_team(team):
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute('''
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, '''
             SELECT * FROM fixtures
             WHERE "isResult" IS TRUE
               AND ("home_team" = %s OR "away_team" = %s)
             ORDER BY id DESC
             LIMIT %s OFFSET %s
         ''', (team, team, limit, offset))
-        return jsonify_records(cur.fetchall())
 
 @app.route("/players/<string:team>", methods=["GET"])
 def players(team):
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute('SELECT * FROM players WHERE "team_title" = %s ORDER BY id ASC LIMIT %s OFFSET %s',
-                    (team, limit, offset))
-        return jsonify_records(cur.fetchall())
+    return stream_query('SELECT * FROM players WHERE "team_title" = %s ORDER BY id ASC LIMIT %s OFFSET %s',
+                        (team, limit, offset))
 
 @app.route("/match/shots/<string:match_id>", methods=["GET"])
 def shot_data(match_id):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with ConnCtx() as conn, conn.cursor() as cur:
         cur.execute('SELECT * FROM shots_data WHERE "match_id" = %s', (match_id,))
-        return jsonify_records(cur.fetchall())
+        return jsonify_cursor(cur)
 
 @app.route("/shots/<string:team>", methods=["GET"])
 def shot_data_team(team):
     # ⚠️ safer than the previous f-string
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute('''
-            SELECT * FROM shots_data
-            WHERE (home_team = %s AND team_side = 'h')
-               OR (away_team = %s AND team_side = 'a')
-        ''', (team, team))
-        return jsonify_records(cur.fetchall())
+    return stream_query('''
+        SELECT * FROM shots_data
+        WHERE (home_team = %s AND team_side = 'h')
+           OR (away_team = %s AND team_side = 'a')
+    ''', (team, team))
 
 @app.route("/match/info/<string:match_id>", methods=["GET"])
 def match_info(match_id):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with ConnCtx() as conn, conn.cursor() as cur:
         cur.execute('SELECT * FROM match_info WHERE "match_id" = %s', (match_id,))
-        return jsonify_records(cur.fetchall())
+        return jsonify_cursor(cur)
 
 @app.route("/match/roster/<string:match_id>", methods=["GET"])
 def match_rosters_data(match_id):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with ConnCtx() as conn, conn.cursor() as cur:
         cur.execute('SELECT * FROM match_rosters_data WHERE "match_id" = %s', (match_id,))
-        return jsonify_records(cur.fetchall())
+        return jsonify_cursor(cur)
 
 @app.route("/weekly_table", methods=["GET"])
 def weekly_table_get():
     with WEEKLY_TABLE_LOCK:
-        if not WEEKLY_TABLE:
-            abort(404, description="Weekly table not available. Try rebuilding.")
-        payload = {
-            "last_built": WEEKLY_TABLE_LAST_BUILT.isoformat() if WEEKLY_TABLE_LAST_BUILT else None,
-            "data": WEEKLY_TABLE,
-        }
-    return jsonify(payload)
+        body, etag = WEEKLY_TABLE_JSON, WEEKLY_TABLE_ETAG
+    if body is None:
+        abort(404, description="Weekly table not available. Try rebuilding.")
+    if etag:
+        # the client revalidates whichever representation it stored; _compress_json tags the gzip one
+        for tag in (etag, _gz_etag(etag)):
+            if request.if_none_match.contains_raw(tag):
+                return Response(status=304, headers={"ETag": tag, "Cache-Control": REVALIDATE})
+    return Response(body, mimetype="application/json", headers={"ETag": etag, "Cache-Control": REVALIDATE})
 
 @app.route("/admin/rebuild_weekly_table", methods=["POST"])
 def weekly_table_rebuild():
@@ -800,136 +1342,113 @@ def weekly_table_rebuild():
 
 @app.route("/<string:team_stat>/<string:team>", methods=["GET"])
 def ind_team_data(team_stat, team):
-    table = _check_team_table(team_stat)
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f'SELECT * FROM {table} WHERE "team_name" = %s', (team,))
-        return jsonify_records(cur.fetchall())
+    by_team, _ = _check_team_table(team_stat)
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_json_query(cur, by_team, (team,))
 
 @app.route("/<string:team_stat>/conceded/<string:team>", methods=["GET"])
 def ind_team_data_conceded(team_stat, team):
-    table = _check_team_table(f"{team_stat}_conceded")
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f'SELECT * FROM {table} WHERE "team_name" = %s', (team,))
-        return jsonify_records(cur.fetchall())
+    by_team, _ = _check_team_table(f"{team_stat}_conceded")
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_json_query(cur, by_team, (team,))
 
 @app.route("/<string:team_stat>", methods=["GET"])
 def team_data(team_stat):
-    table = _check_team_table(team_stat)
+    _, paged = _check_team_table(team_stat)
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f'SELECT * FROM {table} ORDER BY 1 ASC LIMIT %s OFFSET %s', (limit, offset))
-        return jsonify_records(cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_json_query(cur, paged, (limit, offset))
 
 @app.route("/<string:team_stat>/conceded", methods=["GET"])
 def team_data_conceded(team_stat):
-    table = _check_team_table(f"{team_stat}_conceded")
+    _, paged = _check_team_table(f"{team_stat}_conceded")
     limit, offset = _pagination()
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f'SELECT * FROM {table} ORDER BY 1 ASC LIMIT %s OFFSET %s', (limit, offset))
-        return jsonify_records(cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_json_query(cur, paged, (limit, offset))
 
 @app.route("/fpl_predict_summ", methods=["GET"])
+@cached_response
 def fpl_predict_summ():
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f"""
-                    SELECT * FROM prediction_summary
-                    """)
-        return jsonify_records(cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, "SELECT * FROM prediction_summary")
 
 @app.route("/fpl_predict", methods=["GET"])
+@cached_response
 def fpl_predict():
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f"""
-                    SELECT * FROM predicted_next_gw where match_method != 'none'
-                    """)
-        return jsonify_records(cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, "SELECT * FROM predicted_next_gw where match_method != 'none'")
 
 @app.route("/fpl_predict_<string:model>", methods=["GET"])
 def fpl_predict_model(model):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f"""
-                    SELECT * FROM predicted_next_gw where match_method != 'none' and model = '{model}' 
-                    """)
-        return jsonify_records(cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, "SELECT * FROM predicted_next_gw where match_method != 'none' and model = %s",
+                             (model,))
 
 @app.route("/fpl_predict_last_<string:model>", methods=["GET"])
 def fpl_predict_model_last(model):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f"""
-                    SELECT * FROM predicted_last_gw where match_method != 'none' and model = '{model}' 
-                    """)
-        return jsonify_records(cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, "SELECT * FROM predicted_last_gw where match_method != 'none' and model = %s",
+                             (model,))
 
 
 @app.route("/fpl_data", methods=["GET"])
+@cached_response
 def fpl_data():
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f"""
-                    SELECT * FROM fpl_elements_enriched
-                    WHERE match_method != 'none'
-                    """)
-        return jsonify_records(cur.fetchall())
-    
+    return _fpl_elements_page(matched=True)
+
 @app.route("/fpl_data_unmatched", methods=["GET"])
 def fpl_data_unmatched():
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f"""
-                    SELECT * FROM fpl_elements_enriched
-                    WHERE match_method = 'none'
-                    """)
-        return jsonify_records(cur.fetchall())
+    return _fpl_elements_page(matched=False)
 
 @app.route("/leaders/<string:stat>", methods=["GET"])
+@cached_response
 def league_leaders(stat):
-    if stat == 'xg':
-        stat = 'xG'
-    elif stat == 'xa':
-        stat = 'xA'
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(f"""SELECT * FROM players ORDER BY "{stat}"::Decimal DESC LIMIT 5""")
-        return jsonify_records(cur.fetchall())
+    col = LEADER_STATS.get(stat.lower())
+    if col is None:
+        abort(400, description=f"Unknown stat '{stat}'")
+    with ConnCtx() as conn, conn.cursor() as cur:
+        query = sql.SQL("SELECT * FROM players ORDER BY {}::Decimal DESC LIMIT 5").format(sql.Identifier(col))
+        return jsonify_query(cur, query.as_string(cur))
 
 @app.route("/fbref/player/<string:player>", methods=["GET"])
 def fbref_player_data(player):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT get_player_all_stats(%s)", (player,))
-        return (cur.fetchall())
-    
+    with ConnCtx() as conn, conn.cursor() as cur:
+        # same [{"<function>": {...}}] shape as before, built as text in Postgres
+        return jsonify_query(cur, "SELECT get_player_all_stats(%s)", (player,))
+
 @app.route("/fbref/players", methods=["GET"])
 def fbref_players():
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT get_all_players_stats()")
-        return (cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, "SELECT get_all_players_stats()")
 
 @app.route("/fpl_bootstrap", methods=["GET"])
 def fpl_bootstrap():
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT fpl_bootstrap()")
-        return (cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, "SELECT fpl_bootstrap()")
 
 @app.route("/fbref/all_teams", methods=["GET"])
+@cached_response
 def fbref_team_all_data():
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT get_fbref_team_json_all()")
-        return (cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, "SELECT get_fbref_team_json_all()")
 
 @app.route("/fbref/vs_all_teams", methods=["GET"])
+@cached_response
 def fbref_vs_team_all_data():
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT get_fbref_vs_team_json_all()")
-        return (cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        return jsonify_query(cur, "SELECT get_fbref_vs_team_json_all()")
 
 @app.route("/fbref/team/<string:team>", methods=["GET"])
 def fbref_team_data(team):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT get_fbref_team(%s)", (team,))
-        return (cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        # the team tables carry the pipeline's generated name_norm join key; not part of the payload
+        return jsonify_query_without(cur, "SELECT get_fbref_team(%s)", (team,), "name_norm")
 
 @app.route("/fbref/vs_team/<string:team>", methods=["GET"])
 def fbref_vs_team_data(team):
-    with ConnCtx() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT get_fbref_vs_team(%s)", (team,))
-        return (cur.fetchall())
+    with ConnCtx() as conn, conn.cursor() as cur:
+        # the team tables carry the pipeline's generated name_norm join key; not part of the payload
+        return jsonify_query_without(cur, "SELECT get_fbref_vs_team(%s)", (team,), "name_norm")
 
 # -------------------- Error Handlers --------------------
 @app.errorhandler(400)
@@ -968,6 +1487,12 @@ try:
 except Exception:
     logger.exception("Failed to start weekly refresh thread")
 
+try:
+    t = threading.Thread(target=_visit_log_writer_loop, name="visit-log-writer", daemon=True)
+    t.start()
+except Exception:
+    logger.exception("Failed to start visit log writer thread")
+
 # -------------------- Entrypoint --------------------
 if __name__ == "__main__":
     # For local dev only; in prod use gunicorn with PROMETHEUS_MULTIPROC_DIR set
@@ -3,19 +3,23 @@ from __future__ import annotations
 
 import os
 import sys
+import atexit
 import time
 import csv
+import random
 import logging
-from functools import wraps
+import threading
+from functools import wraps, lru_cache
 from time import perf_counter
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import ScraperFC as sfc
-from db_helper import Postgres
+from db_helper import Postgres, copy_dataframe_csv
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine, Connection
 from fbref_remote import FBrefRemote as FBref
-from epl_match import init_matches_all, upsert_match
+from epl_match import init_matches_all, upsert_match, upsert_matches
 from fbref_ingest import ingest_fbref_bundle, ensure_alias_table, DEFAULT_ALIAS_SEEDS
 from typing import Dict, Tuple, Any, Iterable
 import link_understat_fbref as fb_us_xref
@@ -48,7 +52,12 @@ VENUES_CSV = os.environ.get(
     "VENUES_CSV_PATH",
     os.path.join(os.path.dirname(__file__), "venues.csv")
 )
-SLEEP_BETWEEN_MATCHES = int(os.environ.get("SLEEP_BETWEEN_MATCHES", "5"))  # seconds
+SLEEP_BETWEEN_MATCHES = int(os.environ.get("SLEEP_BETWEEN_MATCHES", "5"))  # seconds between match requests
+MATCH_SCRAPE_WORKERS = int(os.environ.get("MATCH_SCRAPE_WORKERS", "4"))
+REPLACE_WORKERS = int(os.environ.get("REPLACE_WORKERS", "4"))
+TO_SQL_CHUNKSIZE = int(os.environ.get("TO_SQL_CHUNKSIZE", "1000"))
+SCRAPE_INTERVAL = float(os.environ.get("SCRAPE_INTERVAL", "5"))  # seconds between understat stage pulls
+FBREF_CLUSTER_PLAYER_TABLES = os.environ.get("FBREF_CLUSTER_PLAYER_TABLES", "false").lower() == "true"
 
 # ---------------------- Helpers ----------------------
 def log_step(fn):
@@ -70,15 +79,64 @@ def log_step(fn):
 def get_conn_string() -> str:
     return f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# Engine, DB helper and scraper are process-wide singletons: one connection pool per pipeline run
+@lru_cache(maxsize=1)
 def get_engine() -> Engine:
-    return create_engine(get_conn_string(), future=True, pool_pre_ping=True, echo=SQLALCHEMY_ECHO)
+    # values_plus_batch: multi-row VALUES for INSERTs, execute_batch for UPDATE/DELETE executemany
+    return create_engine(
+        get_conn_string(), future=True, pool_pre_ping=True, echo=SQLALCHEMY_ECHO,
+        pool_size=max(4, REPLACE_WORKERS), max_overflow=4,
+        executemany_mode="values_plus_batch", insertmanyvalues_page_size=TO_SQL_CHUNKSIZE,
+    )
 
+@lru_cache(maxsize=1)
 def get_db() -> Postgres:
     return Postgres(get_conn_string())
 
+def _dispose_engines():
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    if get_db.cache_info().currsize:
+        get_db().engine.dispose()
+
+atexit.register(_dispose_engines)
+
+class RateLimiter:
+    """
+    Minimum spacing between calls to a source. acquire() only blocks for what is
+    left of the interval since the previous call, so slow work in between counts.
+    """
+    def __init__(self, interval: float, jitter: float = 0.0):
+        self.interval = max(0.0, interval)
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            # reserve our slot before sleeping so concurrent callers queue up behind it
+            self._next = max(now, self._next) + self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        if wait > 0:
+            logger.debug("Rate limiter: sleeping %.2fs", wait)
+            time.sleep(wait)
+
+UNDERSTAT_LIMITER = RateLimiter(SCRAPE_INTERVAL)
+
+@lru_cache(maxsize=1)
 def get_understat() -> sfc.Understat:
     return sfc.Understat()
 
+# the scraper client isn't documented as thread-safe: concurrent match scrapes get one each
+_scrape_local = threading.local()
+
+def _thread_understat() -> sfc.Understat:
+    us = getattr(_scrape_local, "understat", None)
+    if us is None:
+        us = _scrape_local.understat = sfc.Understat()
+    return us
+
 
 def _safe_shape(df: pd.DataFrame | None) -> str:
     try:
@@ -87,86 +145,131 @@ def _safe_shape(df: pd.DataFrame | None) -> str:
         return "unknown"
 
 # ---------------------- Venue lookup ----------------------
-@log_step
-def get_venue(team):
-    logger.debug("Looking up venue for team=%s", team)
+@lru_cache(maxsize=1)
+def _load_venues() -> Dict[str, str]:
     try:
-        with open("venues.csv", newline="", encoding="utf-8") as file:
-            data = list(csv.reader(file))
+        with open(VENUES_CSV, newline="", encoding="utf-8") as file:
+            venues: Dict[str, str] = {}
+            for row in csv.reader(file):
+                if len(row) >= 2:
+                    venues.setdefault(row[0], row[1])  # first row wins, as the old linear scan did
     except FileNotFoundError:
-        logger.warning("venues.csv not found; returning None for team=%s", team)
-        return None
+        logger.warning("%s not found; venues will be None", VENUES_CSV)
+        return {}
     except Exception as e:
-        logger.exception("Error reading venues.csv: %s", e)
-        return None
-
-    for venue in data:
-        if venue and len(venue) >= 2 and venue[0] == team:
-            logger.debug("Found venue for %s: %s", team, venue[1])
-            return venue[1]
-    logger.debug("No venue found for %s", team)
-    return None
+        logger.exception("Error reading %s: %s", VENUES_CSV, e)
+        return {}
+    logger.info("Loaded %d venues from %s", len(venues), VENUES_CSV)
+    return venues
+
+def get_venue(team):
+    return _load_venues().get(team)
+
 # ---------------------- Table swap helpers ----------------------
-def _swap_and_index(conn: Connection, staging: str, name: str, pk_cols=None, index_sql=()):
+def _staging_index_name(staging: str, index: str) -> str:
+    return f"{staging}_{index}"[:63]
+
+def _build_staging(conn: Connection, df: pd.DataFrame, staging: str, pk_cols=None, indexes=(), unique_indexes=()):
+    conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{staging}"')
+    # Same column types to_sql would have picked
+    conn.exec_driver_sql(pd.io.sql.get_schema(df, staging, con=conn))
+    if not df.empty:
+        with conn.connection.cursor() as cur:
+            copy_dataframe_csv(cur, f'"{staging}"', df)
+    # PK and indexes are built on staging, off the live table, before the swap
+    if pk_cols:
+        cols_csv = ",".join(f'"{c}"' for c in pk_cols)
+        conn.exec_driver_sql(f'ALTER TABLE "{staging}" ADD CONSTRAINT "{staging}_pkey" PRIMARY KEY ({cols_csv})')
+    for unique, specs in ((False, indexes), (True, unique_indexes)):
+        for index, cols in specs:
+            cols_csv = ",".join(f'"{c}"' for c in cols)
+            conn.exec_driver_sql(
+                f'CREATE {"UNIQUE " if unique else ""}INDEX "{_staging_index_name(staging, index)}" '
+                f'ON "{staging}" ({cols_csv})'
+            )
+
+def _swap(conn: Connection, staging: str, name: str, pk_cols=None, indexes=(), unique_indexes=()):
     conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{name}" CASCADE')
     conn.exec_driver_sql(f'ALTER TABLE "{staging}" RENAME TO "{name}"')
     if pk_cols:
-        cols_csv = ",".join(f'"{c}"' for c in pk_cols)
-        conn.exec_driver_sql(f'ALTER TABLE "{name}" ADD PRIMARY KEY ({cols_csv})')
-    for sql in index_sql:
-        conn.exec_driver_sql(sql)
+        conn.exec_driver_sql(f'ALTER TABLE "{name}" RENAME CONSTRAINT "{staging}_pkey" TO "{name}_pkey"')
+    for index, _ in (*indexes, *unique_indexes):
+        conn.exec_driver_sql(f'ALTER INDEX "{_staging_index_name(staging, index)}" RENAME TO "{index}"')
 
-def replace_table_atomic(df: pd.DataFrame, name: str, bind: Engine | Connection, pk_cols=None, index_sql=()):
+def replace_table_atomic(df: pd.DataFrame, name: str, bind: Engine | Connection, pk_cols=None,
+                         indexes=(), unique_indexes=()):
     """
     Atomically replace a table:
-      1) write DataFrame to staging via to_sql(replace)
-      2) in a transaction: DROP real table, RENAME staging to real
-      3) reapply PKs and indexes
+      1) build staging: to_sql's column types, COPY the DataFrame in, add PK and indexes
+      2) in a short transaction: DROP real table, RENAME staging (and its PK/indexes) to real
 
+    indexes / unique_indexes: [(index_name, [columns]), ...]
     `bind` may be an Engine or a Connection.
     """
     staging = f"_{name}_staging"
 
-    # 1) Write staging with the same bind
-    df.to_sql(staging, con=bind, if_exists='replace', index=False)
-
-    # 2) Single transaction to swap + 3) reapply PKs/indexes
     if isinstance(bind, Engine):
-        with bind.connect() as conn:
-            with conn.begin():
-                _swap_and_index(conn, staging, name, pk_cols, index_sql)
+        with bind.begin() as conn:
+            _build_staging(conn, df, staging, pk_cols, indexes, unique_indexes)
+        with bind.begin() as conn:
+            _swap(conn, staging, name, pk_cols, indexes, unique_indexes)
     elif isinstance(bind, Connection):
         # Begin a txn on the existing connection; execute on the connection (not the transaction)
         with bind.begin():
-            _swap_and_index(bind, staging, name, pk_cols, index_sql)
+            _build_staging(bind, df, staging, pk_cols, indexes, unique_indexes)
+        with bind.begin():
+            _swap(bind, staging, name, pk_cols, indexes, unique_indexes)
     else:
         raise TypeError("bind must be a SQLAlchemy Engine or Connection")
 
+@lru_cache(maxsize=64)
 def _teamname_from_key(k: str) -> str:
+    # keys repeat across scrapes of the same season (~20 teams)
     return k.split('/')[-2].replace("_", " ")
 
-def _emit_tables_for_category(all_data: dict, category: str, subcat_col: str):
-    created_rows, conceded_rows = [], []
+# understat team_data category -> (subcategory column, created table, conceded table,
+#                                  created team index, conceded team index)
+TEAM_DATA_TABLES = {
+    "formation":   ("formation",   "formations",           "formations_conceded",   "idx_formations_team", "idx_formations_conceded_team"),
+    "situation":   ("situation",   "team_chances_created", "team_chances_conceded", "idx_tcc_team",        "idx_tconc_team"),
+    "gameState":   ("state",       "game_state",           "game_state_conceded",   "idx_gs_team",         "idx_gsc_team"),
+    "timing":      ("period",      "timing",               "timing_conceded",       "idx_timing_team",     "idx_timingc_team"),
+    "shotZone":    ("zone",        "shot_zone",            "shot_zone_conceded",    "idx_sz_team",         "idx_szc_team"),
+    "attackSpeed": ("speed",       "attack_speed",         "attack_speed_conceded", "idx_as_team",         "idx_asc_team"),
+    "result":      ("result_type", "result",               "result_conceded",       "idx_res_team",        "idx_resc_team"),
+}
+
+_TEAM_STAT_COLS = ("shots", "goals", "xG")
+
+def _emit_team_tables(all_data: dict) -> Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """One walk over all_data -> {category: (created_df, conceded_df)} for TEAM_DATA_TABLES."""
+    # Columns are collected as parallel lists and handed to pandas column-wise.
+    buckets = {}
+    for cat, (subcat_col, *_) in TEAM_DATA_TABLES.items():
+        keys = ["team_name", subcat_col] + (["time"] if cat == "formation" else [])
+        buckets[cat] = ({k: [] for k in keys + list(_TEAM_STAT_COLS)},
+                        {k: [] for k in keys + list(_TEAM_STAT_COLS)})
+
     for key, payload in all_data.items():
         team_name = _teamname_from_key(key)
-        cat_dict = payload.get("team_data", {}).get(category, {}) or {}
-        for subkey, sval in cat_dict.items():
-            created_rows.append({
-                "team_name": team_name,
-                subcat_col: subkey,
-                "shots": sval.get("shots"),
-                "goals": sval.get("goals"),
-                "xG": sval.get("xG"),
-            })
-            against = sval.get("against", {}) or {}
-            conceded_rows.append({
-                "team_name": team_name,
-                subcat_col: subkey,
-                "shots": against.get("shots"),
-                "goals": against.get("goals"),
-                "xG": against.get("xG"),
-            })
-    return pd.DataFrame(created_rows), pd.DataFrame(conceded_rows)
+        team_data = payload.get("team_data", {}) or {}
+        for cat, (subcat_col, *_) in TEAM_DATA_TABLES.items():
+            created, conceded = buckets[cat]
+            for subkey, sval in (team_data.get(cat, {}) or {}).items():
+                against = sval.get("against", {}) or {}
+                for cols in (created, conceded):
+                    cols["team_name"].append(team_name)
+                    cols[subcat_col].append(subkey)
+                    if "time" in cols:
+                        cols["time"].append(sval.get("time"))
+                for c in _TEAM_STAT_COLS:
+                    created[c].append(sval.get(c))
+                    conceded[c].append(against.get(c))
+
+    return {
+        cat: tuple(pd.DataFrame(cols) if cols["team_name"] else pd.DataFrame() for cols in pair)
+        for cat, pair in buckets.items()
+    }
 
 def _df_to_jsonable(
     df: pd.DataFrame,
@@ -224,13 +327,15 @@ def update_standings():
     engine = get_engine()
     us = get_understat()
     logger.info("Fetching league tables for %s %s", COMP_ID, SEASON_ID)
+    UNDERSTAT_LIMITER.acquire()
     standings = us.scrape_league_tables(SEASON_ID, COMP_ID)
     if not standings or len(standings) == 0:
         logger.warning("No standings returned.")
         return
     df = standings[0]
     logger.info("Standings dataframe shape: %s", _safe_shape(df))
-    df.to_sql("standings", con=engine, if_exists='replace', index=False)
+    df.to_sql("standings", con=engine, if_exists='replace', index=False,
+              method="multi", chunksize=TO_SQL_CHUNKSIZE)
     logger.info("Standings table replaced in DB.")
 
 @log_step
@@ -239,32 +344,35 @@ def update_fixture_list(season_data):
 
     fixture_data = season_data[0]
     logger.info("Building fixture list from season data: %d fixtures", len(fixture_data))
-    fx_list = []
+    fx_cols = ("id", "isResult", "home_team_id", "home_team", "home_goals", "home_xg",
+               "away_team_id", "away_team", "away_goals", "away_xg", "datetime", "venue")
+    fx = {c: [] for c in fx_cols}
     for fixture in fixture_data:
         try:
             home_title = fixture['h']['title']
-            data = {
-                "id": fixture['id'],
-                "isResult": fixture['isResult'],
-                "home_team_id": fixture['h']['id'],
-                "home_team": home_title,
-                "home_goals": fixture['goals']['h'],
-                "home_xg": fixture['xG']['h'],
-                "away_team_id": fixture['a']['id'],
-                "away_team": fixture['a']['title'],
-                "away_goals": fixture['goals']['a'],
-                "away_xg": fixture['xG']['a'],
-                "datetime": fixture['datetime'],
-                "venue": get_venue(home_title),
-            }
-            fx_list.append(data)
+            row = (
+                fixture['id'],
+                fixture['isResult'],
+                fixture['h']['id'],
+                home_title,
+                fixture['goals']['h'],
+                fixture['xG']['h'],
+                fixture['a']['id'],
+                fixture['a']['title'],
+                fixture['goals']['a'],
+                fixture['xG']['a'],
+                fixture['datetime'],
+                get_venue(home_title),
+            )
         except Exception:
             logger.exception("Failed to process fixture row: %s", fixture)
             continue
+        for c, v in zip(fx_cols, row):
+            fx[c].append(v)
 
-    fixture_df = pd.DataFrame(fx_list)
+    fixture_df = pd.DataFrame(fx) if fx["id"] else pd.DataFrame()
     logger.info("Fixture DF built: %s", _safe_shape(fixture_df))
-    fixture_df.to_sql("fixtures", con=engine, if_exists='replace', index=False)
+    replace_table_atomic(fixture_df, "fixtures", engine)
     logger.info("Fixtures table replaced in DB.")
 
 @log_step
@@ -275,6 +383,7 @@ def build_teams_data(season_data):
 # -------- Source pulls --------
     teams = []
     teams_data = season_data[1]
+    UNDERSTAT_LIMITER.acquire()
     all_teams_data = us.scrape_all_teams_data(SEASON_ID, COMP_ID)
     logger.info("Processing teams metadata: %d teams", len(teams_data.keys()))
 
@@ -284,139 +393,25 @@ def build_teams_data(season_data):
             "team_name": teams_data[key]['title']
         })
 
-    # -------- epl_teams (atomic replace + indexes) --------
+    # -------- epl_teams + team_data categories (created & conceded) --------
+    # Each job replaces a distinct table atomically, so they can run side by side.
     teams_df = pd.DataFrame(teams)
-    logger.info("Teams DF shape: %s", _safe_shape(teams_df))
-    replace_table_atomic(
-        teams_df, "epl_teams", engine,
-        pk_cols=["team_id"],
-        index_sql=[
-            'CREATE UNIQUE INDEX IF NOT EXISTS idx_epl_teams_name ON "epl_teams" ("team_name")'
-        ],
-    )
-    logger.info("epl_teams table replaced in DB.")
-
-    # -------- formations (created & conceded) --------
-    formations_created, formations_conceded = [], []
-    for key in all_teams_data.keys():
-        team_name = _teamname_from_key(key)
-        fdict = all_teams_data[key].get('team_data', {}).get('formation', {}) or {}
-        for fkey, fval in fdict.items():
-            formations_created.append({
-                "team_name": team_name,
-                "formation": fkey,
-                "time": fval.get('time'),
-                "shots": fval.get('shots'),
-                "goals": fval.get('goals'),
-                "xG": fval.get('xG'),
-            })
-            against = fval.get('against', {}) or {}
-            formations_conceded.append({
-                "team_name": team_name,
-                "formation": fkey,
-                "time": fval.get('time'),
-                "shots": against.get('shots'),
-                "goals": against.get('goals'),
-                "xG": against.get('xG'),
-            })
-
-    formations_df = pd.DataFrame(formations_created)
-    logger.info("Formations DF shape: %s", _safe_shape(formations_df))
-    replace_table_atomic(
-        formations_df, "formations", engine,
-        pk_cols=["team_name", "formation"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_formations_team ON "formations" ("team_name")']
-    )
-    logger.info("formations table replaced in DB.")
-
-    formations_conceded_df = pd.DataFrame(formations_conceded)
-    logger.info("formations_conceded DF shape: %s", _safe_shape(formations_conceded_df))
-    replace_table_atomic(
-        formations_conceded_df, "formations_conceded", engine,
-        pk_cols=["team_name", "formation"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_formations_conceded_team ON "formations_conceded" ("team_name")']
-    )
-    logger.info("formations_conceded table replaced in DB.")
-
-    # -------- situation (created & conceded) --------
-    created, conceded = _emit_tables_for_category(all_teams_data, "situation", "situation")
-    logger.info("team_chances_created DF shape: %s", _safe_shape(created))
-    replace_table_atomic(
-        created, "team_chances_created", engine,
-        pk_cols=["team_name", "situation"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_tcc_team ON "team_chances_created" ("team_name")']
-    )
-    logger.info("team_chances_conceded DF shape: %s", _safe_shape(conceded))
-    replace_table_atomic(
-        conceded, "team_chances_conceded", engine,
-        pk_cols=["team_name", "situation"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_tconc_team ON "team_chances_conceded" ("team_name")']
-    )
-
-    # -------- gameState --------
-    created, conceded = _emit_tables_for_category(all_teams_data, "gameState", "state")
-    replace_table_atomic(
-        created, "game_state", engine,
-        pk_cols=["team_name", "state"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_gs_team ON "game_state" ("team_name")']
-    )
-    replace_table_atomic(
-        conceded, "game_state_conceded", engine,
-        pk_cols=["team_name", "state"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_gsc_team ON "game_state_conceded" ("team_name")']
-    )
-
-    # -------- timing --------
-    created, conceded = _emit_tables_for_category(all_teams_data, "timing", "period")
-    replace_table_atomic(
-        created, "timing", engine,
-        pk_cols=["team_name", "period"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_timing_team ON "timing" ("team_name")']
-    )
-    replace_table_atomic(
-        conceded, "timing_conceded", engine,
-        pk_cols=["team_name", "period"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_timingc_team ON "timing_conceded" ("team_name")']
-    )
-
-    # -------- shotZone --------
-    created, conceded = _emit_tables_for_category(all_teams_data, "shotZone", "zone")
-    replace_table_atomic(
-        created, "shot_zone", engine,
-        pk_cols=["team_name", "zone"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_sz_team ON "shot_zone" ("team_name")']
-    )
-    replace_table_atomic(
-        conceded, "shot_zone_conceded", engine,
-        pk_cols=["team_name", "zone"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_szc_team ON "shot_zone_conceded" ("team_name")']
-    )
-
-    # -------- attackSpeed --------
-    created, conceded = _emit_tables_for_category(all_teams_data, "attackSpeed", "speed")
-    replace_table_atomic(
-        created, "attack_speed", engine,
-        pk_cols=["team_name", "speed"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_as_team ON "attack_speed" ("team_name")']
-    )
-    replace_table_atomic(
-        conceded, "attack_speed_conceded", engine,
-        pk_cols=["team_name", "speed"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_asc_team ON "attack_speed_conceded" ("team_name")']
-    )
-
-    # -------- result --------
-    created, conceded = _emit_tables_for_category(all_teams_data, "result", "result_type")
-    replace_table_atomic(
-        created, "result", engine,
-        pk_cols=["team_name", "result_type"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_res_team ON "result" ("team_name")']
-    )
-    replace_table_atomic(
-        conceded, "result_conceded", engine,
-        pk_cols=["team_name", "result_type"],
-        index_sql=['CREATE INDEX IF NOT EXISTS idx_resc_team ON "result_conceded" ("team_name")']
-    )
+    jobs = [(teams_df, "epl_teams", dict(pk_cols=["team_id"],
+                                         unique_indexes=[("idx_epl_teams_name", ["team_name"])]))]
+    for cat, (created, conceded) in _emit_team_tables(all_teams_data).items():
+        subcat_col, created_table, conceded_table, created_idx, conceded_idx = TEAM_DATA_TABLES[cat]
+        for df, table, idx in ((created, created_table, created_idx), (conceded, conceded_table, conceded_idx)):
+            jobs.append((df, table, dict(pk_cols=["team_name", subcat_col], indexes=[(idx, ["team_name"])])))
+
+    def _replace(job):
+        df, table, kwargs = job
+        logger.info("%s DF shape: %s", table, _safe_shape(df))
+        replace_table_atomic(df, table, engine, **kwargs)
+        logger.info("%s table replaced in DB.", table)
+
+    # stays within the engine's pool_size, so no job waits on a connection
+    with ThreadPoolExecutor(max_workers=REPLACE_WORKERS, thread_name_prefix="replace") as ex:
+        list(ex.map(_replace, jobs))  # re-raises the first failure
 
     logger.info("All tables replaced atomically.")
 
@@ -425,13 +420,14 @@ def update_player_db(season_data):
     engine = get_engine()
     players_df = pd.DataFrame(season_data[2])
     logger.info("Players DF shape: %s", _safe_shape(players_df))
-    players_df.to_sql("players", con=engine, if_exists='replace', index=False)
+    replace_table_atomic(players_df, "players", engine)
     logger.info("players table replaced in DB.")
 
 @log_step
 def init_match_data():
     us = get_understat()
     logger.info("Scraping initial matches for %s %s", COMP_ID, SEASON_ID)
+    UNDERSTAT_LIMITER.acquire()
     all_match_data = us.scrape_matches(SEASON_ID, COMP_ID)
     logger.info("Matches scraped: %d", len(all_match_data))
     init_matches_all(all_match_data)
@@ -477,10 +473,29 @@ def install_sql_functions():
     sql_func.install(engine)
 
 
+@log_step
+def refresh_weekly_table():
+    engine = get_engine()
+    sql_func.install_weekly_table(engine)  # no-op once the view exists
+    sql_func.refresh_weekly_table(engine)
+
+@log_step
+def refresh_fbref_json_cache():
+    # team/vs-team JSON payloads served by the API; rebuilt once per fbref ingest
+    sql_func.refresh_fbref_json_cache(get_engine())
+
+@log_step
+def maintain_fbref_indexes():
+    # the ingest recreates the player_id indexes; this restores the rest (e.g. the xref ones,
+    # replaced by build_xrefs). CLUSTER locks the tables against reads: only when opted in
+    engine = get_engine()
+    sql_func.create_indexes(engine)
+    if FBREF_CLUSTER_PLAYER_TABLES:
+        sql_func.cluster_player_tables(engine)
+
 @log_step
 def update_match_data():
     db = get_db()
-    us = get_understat()
 
     MATCH_BASE_URL = "https://understat.com/match/"
     SQL_QUERY = 'SELECT * FROM fixtures WHERE "isResult" IS False'
@@ -504,58 +519,92 @@ def update_match_data():
     logger.info("Fixtures due for update (<= now UTC): %d; sample=%s",
                 len(match_ids), match_ids[:10])
 
-    for mid in match_ids:
+    if not match_ids:
+        return
+
+    workers = max(1, min(MATCH_SCRAPE_WORKERS, len(match_ids)))
+    # SLEEP_BETWEEN_MATCHES between requests across the whole pool (workers only overlap the
+    # response time, never the politeness delay); jitter keeps requests off a fixed beat
+    limiter = RateLimiter(SLEEP_BETWEEN_MATCHES, jitter=0.5)
+    UNDERSTAT_LIMITER.acquire()
+
+    def _scrape(mid):
         match_url = f"{MATCH_BASE_URL}{mid}"
+        limiter.acquire()
         logger.info("Scraping match %s -> %s", mid, match_url)
         try:
-            match_data = us.scrape_match(match_url)
-            upsert_match(match_data)
-            logger.info("Upserted match_id=%s", mid)
+            return mid, _thread_understat().scrape_match(match_url)
+        except Exception:
+            logger.exception("Failed to scrape match_id=%s", mid)
+            return mid, None
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape") as ex:
+        results = list(ex.map(_scrape, match_ids))
+
+    blobs = [data for _, data in results if data is not None]
+    logger.info("Matches scraped: %d/%d", len(blobs), len(match_ids))
+    if not blobs:
+        return
+    try:
+        n = upsert_matches(blobs)
+        logger.info("Upserted %d matches: %s", n, [mid for mid, data in results if data is not None])
+        return
+    except Exception:
+        logger.exception("Failed to upsert match batch; retrying one match at a time")
+
+    # one bad blob must not cost the whole run: isolate it like the old per-match loop did
+    ok, bad = [], []
+    for mid, data in results:
+        if data is None:
+            continue
+        try:
+            upsert_match(data)
+            ok.append(mid)
         except Exception:
             logger.exception("Failed to upsert match_id=%s", mid)
-        logger.debug("Sleeping 5s to be polite to the source…")
-        time.sleep(5)
+            bad.append(mid)
+    logger.info("Upserted %d matches one by one; failed: %s", len(ok), bad)
 
 @log_step
 def init_db():
     us = get_understat()
     logger.info("Scraping season data for %s %s", COMP_ID, SEASON_ID)
+    UNDERSTAT_LIMITER.acquire()
     season_data = us.scrape_season_data(SEASON_ID, COMP_ID)
     logger.info("Season data scraped: fixtures=%s, teams/meta=%s, players=%s",
                 len(season_data[0]) if season_data and len(season_data) > 0 else "?", 
                 len(season_data[1]) if season_data and len(season_data) > 1 else "?", 
                 len(season_data[2]) if season_data and len(season_data) > 2 else "?")
-    time.sleep(5)
     update_standings()
     update_player_db(season_data)
     update_fixture_list(season_data)
     build_teams_data(season_data)
-    logger.debug("Pause before match init…")
-    time.sleep(5)
     fbref_data()
     init_match_data()
     install_sql_functions()
+    if FBREF_CLUSTER_PLAYER_TABLES:
+        maintain_fbref_indexes()
     
 
 @log_step
 def update_db():
     us = get_understat()
     logger.info("Scraping season data for %s %s", COMP_ID, SEASON_ID)
+    UNDERSTAT_LIMITER.acquire()
     season_data = us.scrape_season_data(SEASON_ID, COMP_ID)
     logger.info("Season data scraped: fixtures=%s, teams/meta=%s, players=%s",
                 len(season_data[0]) if season_data and len(season_data) > 0 else "?", 
                 len(season_data[1]) if season_data and len(season_data) > 1 else "?", 
                 len(season_data[2]) if season_data and len(season_data) > 2 else "?")
-    time.sleep(5)
     update_match_data()
-    logger.debug("Post-match update pause…")
-    time.sleep(5)
+    refresh_weekly_table()
     update_standings()
     update_player_db(season_data)
     update_fixture_list(season_data)
     build_teams_data(season_data)
-    time.sleep(5)
     fbref_data()
+    refresh_fbref_json_cache()
+    maintain_fbref_indexes()
 
 def _main():
     logger.info("Pipeline start: COMP_ID=%s SEASON_ID=%s", COMP_ID, SEASON_ID)
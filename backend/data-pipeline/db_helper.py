@@ -1,6 +1,14 @@
 # postgres_helper.py
 from __future__ import annotations
 
+import csv
+import json
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime
 from io import StringIO
 from typing import Dict, Iterable, List, Optional, Union
 
@@ -8,13 +16,12 @@ import pandas as pd
 from sqlalchemy import (
     create_engine, MetaData, Table, Column, Index, text
 )
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.types import (
     Integer, BigInteger, Float, Numeric, String, Text,
     Date, Time, DateTime, Boolean, JSON, UUID
 )
-from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import Any, Tuple
 
 # Optional: only needed for COPY path
@@ -23,6 +30,28 @@ try:
 except Exception:
     psycopg2 = None
 
+# Optional: psycopg 3 enables binary COPY (no CSV encoding in Python)
+try:
+    import psycopg
+    from psycopg.types.json import set_json_dumps
+except Exception:
+    psycopg = None
+
+# Optional: reads large results straight into Arrow/pandas (query_df_large)
+try:
+    import connectorx
+except Exception:
+    connectorx = None
+
+# Optional: faster JSON encoding for dict/list cells
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+# pg_type OIDs for integer columns: float-typed frames (ints with NaN) must be cast back
+_PG_INT_OIDS = frozenset({20, 21, 23})  # int8, int2, int4
+
 
 _SQL_TYPE_MAP = {
     "int": Integer,
@@ -45,10 +74,12 @@ _SQL_TYPE_MAP = {
     "uuid": UUID,
 }
 
+@lru_cache(maxsize=256)
 def _parse_type(type_str: str):
     """
     Map a friendly string like 'varchar(255)' or 'integer' to a SQLAlchemy type.
     Falls back to raw SQL if not recognized (advanced users can pass 'geometry', etc.).
+    Cached: the same type string returns the same (never mutated) type object.
     """
     ts = type_str.strip().lower()
     if ts.startswith("varchar(") and ts.endswith(")"):
@@ -69,6 +100,201 @@ def _parse_type(type_str: str):
     return text(type_str)
 
 
+COPY_CHUNK_ROWS = int(os.environ.get("COPY_CHUNK_ROWS", "100000"))
+
+# insert_dict() switches from executemany to COPY at this many rows
+INSERT_DICT_COPY_MIN_ROWS = 500
+
+# Per-transaction settings for bulk_session(); SET LOCAL so they never leak into the pool
+BULK_SESSION_SETTINGS = (
+    "SET LOCAL synchronous_commit = off",
+    "SET LOCAL client_min_messages = warning",
+    "SET LOCAL work_mem = '256MB'",
+)
+
+def _json_dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(value, default=str)
+
+def _encode_json_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Serialize object columns holding dict/list cells to JSON text; to_csv would
+    otherwise write their Python repr, which json/jsonb columns reject.
+    """
+    encoded = {}
+    for c in df.columns:
+        s = df[c]
+        if s.dtype != object:
+            continue
+        present = s.notna().to_numpy()
+        # sniff the first non-null cell only
+        if present.any() and isinstance(s.iat[int(present.argmax())], (dict, list)):
+            encoded[c] = s.map(lambda v: _json_dumps(v) if isinstance(v, (dict, list)) else v)
+    return df.assign(**encoded) if encoded else df
+
+# to_csv options matching COPY (FORMAT CSV, NULL '\N'). The line terminator is pinned rather than
+# os.linesep; no escapechar, since COPY CSV escapes quotes by doubling, which is pandas' default.
+_CSV_KW = dict(index=False, header=False, na_rep="\\N", lineterminator="\n", quoting=csv.QUOTE_MINIMAL)
+
+def copy_dataframe_csv(cur, fqtn: str, df: pd.DataFrame, *, chunk_rows: int = COPY_CHUNK_ROWS) -> None:
+    """
+    COPY a DataFrame as CSV (NULL \\N) through a psycopg2 cursor.
+
+    Frames larger than chunk_rows are serialized chunk by chunk on a writer thread into
+    an os.pipe() that copy_expert reads from, so encoding and sending overlap and at
+    most one chunk of CSV is held in memory.
+    """
+    cols = ", ".join(f'"{c}"' for c in df.columns)
+    sql = f'COPY {fqtn} ({cols}) FROM STDIN WITH (FORMAT CSV, NULL \'\\N\')'
+    df = _encode_json_columns(df)
+
+    if len(df) <= chunk_rows:
+        # one chunk: a buffer is cheaper than a thread
+        buf = StringIO()
+        df.to_csv(buf, **_CSV_KW)
+        buf.seek(0)
+        cur.copy_expert(sql=sql, file=buf)
+        return
+
+    r_fd, w_fd = os.pipe()
+    errors: List[BaseException] = []
+
+    def _writer():
+        try:
+            with os.fdopen(w_fd, "w", encoding="utf-8", newline="") as w:
+                for start in range(0, len(df), chunk_rows):
+                    df.iloc[start:start + chunk_rows].to_csv(w, **_CSV_KW)
+        except BaseException as e:  # BrokenPipeError if COPY failed first
+            errors.append(e)
+
+    writer = threading.Thread(target=_writer, name="copy-csv-writer", daemon=True)
+    writer.start()
+    try:
+        with os.fdopen(r_fd, "rb") as r:
+            cur.copy_expert(sql=sql, file=r)
+    finally:
+        writer.join()
+    if errors:
+        # the writer closing early looks like EOF to COPY; fail so the caller rolls back
+        raise errors[0]
+
+
+def to_sql_copy(table, conn, keys, data_iter) -> None:
+    """
+    DataFrame.to_sql method=: pandas still creates/replaces the table, the rows are
+    streamed from data_iter as COPY CSV (NULL \\N, so empty strings stay empty strings).
+    JSON/JSONB columns are json-encoded like SQLAlchemy would (None -> null); dict/list
+    cells elsewhere are json-encoded too.
+    """
+    json_idx = [i for i, k in enumerate(keys) if isinstance(table.table.c[k].type, JSON)]
+    buf = StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    for row in data_iter:
+        row = list(row)
+        for i in json_idx:
+            row[i] = _json_dumps(row[i])
+        w.writerow([
+            "\\N" if v is None else _json_dumps(v) if isinstance(v, (dict, list)) else v
+            for v in row
+        ])
+    buf.seek(0)
+
+    cols = ", ".join(f'"{k}"' for k in keys)
+    fqtn = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(sql=f"COPY {fqtn} ({cols}) FROM STDIN WITH (FORMAT CSV, NULL '\\N')", file=buf)
+
+# ---------- binary COPY encoding ----------
+COPY_BUFFER_SIZE = 1 << 20  # flush to the server every ~1 MiB
+
+_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)  # signature, flags, no extension
+_BINARY_TRAILER = struct.pack(">h", -1)
+_BINARY_NULL = struct.pack(">i", -1)
+_PG_EPOCH = datetime(2000, 1, 1)
+_PG_EPOCH_ORDINAL = _PG_EPOCH.toordinal()
+
+def _fixed(fmt: str):
+    pack = struct.Struct(fmt).pack
+    return lambda v: pack(v)
+
+def _enc_timestamp(v) -> bytes:
+    d = v - _PG_EPOCH
+    return struct.pack(">q", (d.days * 86400 + d.seconds) * 1_000_000 + d.microseconds)
+
+def _enc_json(v) -> bytes:
+    return (v if isinstance(v, str) else _json_dumps(v)).encode()
+
+# pg_type OID -> value encoder for the types the pipeline writes; anything else uses write_row()
+_BINARY_ENCODERS = {
+    16: lambda v: b"\x01" if v else b"\x00",                  # bool
+    20: _fixed(">q"),                                          # int8
+    21: _fixed(">h"),                                          # int2
+    23: _fixed(">i"),                                          # int4
+    700: _fixed(">f"),                                         # float4
+    701: _fixed(">d"),                                         # float8
+    25: lambda v: str(v).encode(),                             # text
+    1042: lambda v: str(v).encode(),                           # bpchar
+    1043: lambda v: str(v).encode(),                           # varchar
+    1082: lambda v: struct.pack(">i", v.toordinal() - _PG_EPOCH_ORDINAL),  # date
+    1114: _enc_timestamp,                                      # timestamp (naive)
+    114: _enc_json,                                            # json
+    3802: lambda v: b"\x01" + _enc_json(v),                    # jsonb, version 1
+}
+
+def _write_binary_rows(copy, buf: bytearray, types: List[int], values: List[list]) -> None:
+    """
+    Encode rows straight into the binary COPY wire format inside a fixed buffer,
+    handing it to copy.write() whenever the next tuple would not fit.
+    """
+    cap = len(buf)
+    encoders = [_BINARY_ENCODERS[t] for t in types]
+    pack_len = struct.Struct(">i").pack
+    field_count = struct.pack(">h", len(types))
+
+    with memoryview(buf) as mv:
+        mv[:len(_BINARY_HEADER)] = _BINARY_HEADER
+        pos = len(_BINARY_HEADER)
+        for row in zip(*values):
+            parts = [field_count]
+            for enc, v in zip(encoders, row):
+                if v is None:
+                    parts.append(_BINARY_NULL)
+                    continue
+                try:
+                    data = enc(v)
+                except struct.error as e:  # out of range / wrong type for the column
+                    raise ValueError(f"{v!r}: {e}") from e
+                parts.append(pack_len(len(data)))
+                parts.append(data)
+            tup = b"".join(parts)
+            n = len(tup)
+            if pos + n > cap:
+                copy.write(bytes(mv[:pos]))
+                pos = 0
+                if n > cap:  # a single tuple bigger than the buffer goes out on its own
+                    copy.write(tup)
+                    continue
+            mv[pos:pos + n] = tup
+            pos += n
+        if pos + len(_BINARY_TRAILER) > cap:
+            copy.write(bytes(mv[:pos]))
+            pos = 0
+        mv[pos:pos + len(_BINARY_TRAILER)] = _BINARY_TRAILER
+        copy.write(bytes(mv[:pos + len(_BINARY_TRAILER)]))
+
+def _column_values(series: pd.Series, oid: int) -> list:
+    """One DataFrame column as Python scalars for a binary COPY, NA -> None."""
+    if oid in _PG_INT_OIDS and series.dtype.kind == "f":
+        series = series.astype("Int64")
+    mask = series.isna().to_numpy()
+    values = series.tolist()
+    if mask.any():
+        for i in mask.nonzero()[0]:
+            values[i] = None
+    return values
+
+
 class Postgres:
     """
     Lightweight Postgres utility for table creation, bulk inserts, and UPSERTs.
@@ -104,8 +330,37 @@ class Postgres:
     """
 
     def __init__(self, url: str, *, echo: bool = False, future: bool = True):
-        self.engine: Engine = create_engine(url, echo=echo, future=future)
+        kwargs: Dict[str, Any] = {}
+        if make_url(url).get_driver_name() == "psycopg2":
+            # execute_values-style batched VALUES for INSERT executemany, execute_batch for the rest.
+            # psycopg 3 URLs need nothing here: SQLAlchemy's insertmanyvalues is on by default.
+            kwargs.update(
+                executemany_mode="values_plus_batch",
+                insertmanyvalues_page_size=10_000,
+                executemany_batch_page_size=1000,
+            )
+        self.engine: Engine = create_engine(url, echo=echo, future=future, **kwargs)
         self.metadata = MetaData()
+        # reflected tables, kept apart from the ones create_table() declares
+        self._reflected = MetaData()
+        self._tbl_cache: Dict[Tuple[Optional[str], str], Table] = {}
+        self._tbl_lock = threading.Lock()
+        # binary COPY buffers, reused across loads instead of a fresh 1 MiB per call
+        self._copy_bufs: List[bytearray] = []
+        self._copy_bufs_lock = threading.Lock()
+
+    def _table(self, table_name: str, schema: Optional[str] = None) -> Table:
+        """Reflect a table once and reuse it (no INFORMATION_SCHEMA round trips per call)."""
+        key = (schema, table_name)
+        tbl = self._tbl_cache.get(key)
+        if tbl is None:
+            with self._tbl_lock:
+                tbl = self._tbl_cache.get(key)
+                if tbl is None:
+                    self._reflected.reflect(bind=self.engine, only=[table_name], schema=schema)
+                    tbl = self._reflected.tables[f"{schema}.{table_name}" if schema else table_name]
+                    self._tbl_cache[key] = tbl
+        return tbl
 
     # ---------- 1) CREATE TABLE ----------
     def create_table(
@@ -186,11 +441,14 @@ class Postgres:
         schema: Optional[str] = None,
         use_copy: bool = True,
         chunksize: int = 50_000,
+        cur=None,
     ):
         """
         Fast bulk insert of a DataFrame.
 
-        - Tries PostgreSQL COPY for speed (requires psycopg2).
+        - With `cur` from bulk_session(): CSV COPY on that cursor, committed with the session.
+        - Binary COPY when psycopg 3 is installed (no CSV encoding in Python).
+        - Otherwise CSV COPY through psycopg2.
         - Falls back to pandas.to_sql if COPY is unavailable.
         """
         if df.empty:
@@ -198,25 +456,22 @@ class Postgres:
 
         fqtn = f'"{schema}"."{table_name}"' if schema else f'"{table_name}"'
 
-        if use_copy and psycopg2 is not None:
-            raw = self.engine.raw_connection()
+        if cur is not None:
+            copy_dataframe_csv(cur, fqtn, df)
+            return
+
+        if use_copy and psycopg is not None:
             try:
-                with raw.cursor() as cur:
-                    buf = StringIO()
-                    # Write CSV without header; ensure NaN -> \N for NULL
-                    df.to_csv(buf, index=False, header=False, na_rep="\\N")
-                    buf.seek(0)
-                    cols = ", ".join(f'"{c}"' for c in df.columns)
-                    cur.copy_expert(
-                        sql=f'COPY {fqtn} ({cols}) FROM STDIN WITH (FORMAT CSV, NULL \'\\N\')',
-                        file=buf
-                    )
-                raw.commit()
-            except Exception:
-                raw.rollback()
-                raise
-            finally:
-                raw.close()
+                self._copy_binary(fqtn, df)
+                return
+            except (TypeError, ValueError, psycopg.DataError):
+                # a value the binary dumper for its column type can't take (e.g. float -> numeric);
+                # the psycopg 3 transaction is already rolled back, so retry as text CSV
+                if psycopg2 is None:
+                    raise
+            self._copy_csv(fqtn, df)
+        elif use_copy and psycopg2 is not None:
+            self._copy_csv(fqtn, df)
         else:
             # Fallback: pandas (uses SQLAlchemy executemany)
             df.to_sql(
@@ -229,6 +484,116 @@ class Postgres:
                 method="multi",
             )
 
+    @contextmanager
+    def bulk_session(self):
+        """
+        Check out one raw connection and cursor for loading many tables back to back.
+        Yields (raw_connection, cursor); commits once on exit, rolls back on error.
+
+            with db.bulk_session() as (_, cur):
+                db.insert_dataframe("a", df_a, cur=cur)
+                db.insert_dataframe("b", df_b, cur=cur)
+        """
+        raw = self.engine.raw_connection()
+        try:
+            with raw.cursor() as cur:
+                for stmt in BULK_SESSION_SETTINGS:
+                    cur.execute(stmt)
+                yield raw, cur
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def _copy_csv(self, fqtn: str, df: pd.DataFrame) -> None:
+        raw = self.engine.raw_connection()
+        try:
+            with raw.cursor() as cur:
+                copy_dataframe_csv(cur, fqtn, df)
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def _psycopg_conninfo(self) -> str:
+        # same target as the engine, as a plain libpq URL for psycopg 3
+        return self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    def _psycopg_connect(self):
+        conn = psycopg.connect(self._psycopg_conninfo())
+        if orjson is not None:
+            # json/jsonb cells in binary COPY are dumped with orjson instead of stdlib json
+            set_json_dumps(orjson.dumps, context=conn)
+        return conn
+
+    def _copy_binary(self, fqtn: str, df: pd.DataFrame) -> None:
+        with self._psycopg_connect() as conn, conn.cursor() as cur:
+            self._copy_binary_cur(cur, fqtn, df)
+
+    @staticmethod
+    def _column_oids(cur, fqtn: str, cols: List[str]) -> List[int]:
+        cur.execute(
+            "SELECT attname, atttypid::int FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped",
+            (fqtn,),
+        )
+        oids = dict(cur.fetchall())
+        missing = [c for c in cols if c not in oids]
+        if missing:
+            raise KeyError(f"Columns not in {fqtn}: {missing}")
+        return [oids[c] for c in cols]
+
+    def _copy_binary_cur(self, cur, fqtn: str, df: pd.DataFrame) -> None:
+        """
+        COPY ... FROM STDIN (FORMAT BINARY) via a psycopg 3 cursor. Binary COPY needs the exact
+        target column types, so they are read from the catalog.
+        """
+        cols = list(df.columns)
+        types = self._column_oids(cur, fqtn, cols)
+        # column-wise conversion to Python scalars with NA -> None, then zipped into rows
+        values = [_column_values(df[c], oid) for c, oid in zip(cols, types)]
+        self._copy_binary_values(cur, fqtn, cols, types, values)
+
+    def _copy_binary_values(self, cur, fqtn: str, cols: List[str], types: List[int], values: List[list]) -> None:
+        """
+        Stream column-wise values (None for NULL). Tuples are encoded into a pooled buffer when
+        every column type has an encoder, else psycopg's write_row() does it.
+        """
+        col_sql = ", ".join(f'"{c}"' for c in cols)
+        with cur.copy(f"COPY {fqtn} ({col_sql}) FROM STDIN WITH (FORMAT BINARY)") as copy:
+            if all(t in _BINARY_ENCODERS for t in types):
+                buf = self._take_copy_buf()
+                try:
+                    _write_binary_rows(copy, buf, types, values)
+                finally:
+                    self._give_copy_buf(buf)
+            else:
+                copy.set_types(types)
+                for row in zip(*values):
+                    copy.write_row(row)
+
+    def _copy_dicts(self, fqtn: str, data: List[Dict]) -> None:
+        """Binary COPY of a list of dicts; columns come from the first dict."""
+        cols = list(data[0].keys())
+        values = [[d.get(c) for d in data] for c in cols]
+        with self._psycopg_connect() as conn, conn.cursor() as cur:
+            types = self._column_oids(cur, fqtn, cols)
+            self._copy_binary_values(cur, fqtn, cols, types, values)
+
+    def _take_copy_buf(self) -> bytearray:
+        with self._copy_bufs_lock:
+            if self._copy_bufs:
+                return self._copy_bufs.pop()
+        return bytearray(COPY_BUFFER_SIZE)
+
+    def _give_copy_buf(self, buf: bytearray) -> None:
+        with self._copy_bufs_lock:
+            self._copy_bufs.append(buf)
+
     # ---------- 3) UPSERT DATAFRAME ----------
     def upsert_dataframe(
         self,
@@ -238,44 +603,72 @@ class Postgres:
         conflict_columns: List[str],
         update_columns: Optional[List[str]] = None,
         schema: Optional[str] = None,
-        chunksize: int = 20_000,
+        chunksize: Optional[int] = None,
+        synchronous_commit: bool = True,
     ):
         """
         Upsert a DataFrame using PostgreSQL ON CONFLICT DO UPDATE.
 
         conflict_columns: columns that define the unique/PK constraint (must exist as a real constraint/index).
         update_columns: columns to update on conflict; defaults to all df columns except conflict columns.
+        synchronous_commit: pass False for re-loadable bulk data to skip waiting on the WAL flush at commit.
+        chunksize: accepted for backward compatibility and ignored; the COPY load is not batched.
 
         Notes:
         - Requires the target table to exist and have a UNIQUE/PRIMARY KEY on conflict_columns.
-        - Automatically chunks large frames.
+        - Rows repeating a conflict key are collapsed first (last one wins).
+        - COPYs the frame into a TEMP staging table (LIKE the target, dropped on commit),
+          then merges it with a single INSERT ... SELECT ... ON CONFLICT.
+        - The whole upsert is one connection and one transaction, whatever the frame size.
         """
         if df.empty:
             return
 
-        metadata = MetaData(schema=schema)
-        table = Table(table_name, metadata, autoload_with=self.engine)
+        # last row per key wins; repeated keys would abort the merge
+        df = df.drop_duplicates(subset=conflict_columns, keep="last")
+
+        fqtn = f'"{schema}"."{table_name}"' if schema else f'"{table_name}"'
+        # temp tables live in pg_temp and can't be schema-qualified
+        stg = f'"stg_{table_name}"'
 
         if update_columns is None:
             update_columns = [c for c in df.columns if c not in set(conflict_columns)]
 
-        records = df.to_dict(orient="records")
-
-        def _do_chunk(chunk):
-            stmt = pg_insert(table).values(chunk)
-            set_dict = {col: stmt.excluded[col] for col in update_columns}
-            stmt = stmt.on_conflict_do_update(
-                index_elements=conflict_columns,
-                set_=set_dict
-            )
-            with self.engine.begin() as conn:
-                conn.execute(stmt)
-
-        if len(records) <= chunksize:
-            _do_chunk(records)
+        cols = ", ".join(f'"{c}"' for c in df.columns)
+        conflict = ", ".join(f'"{c}"' for c in conflict_columns)
+        if update_columns:
+            action = "DO UPDATE SET " + ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in update_columns)
         else:
-            for i in range(0, len(records), chunksize):
-                _do_chunk(records[i : i + chunksize])
+            action = "DO NOTHING"
+        create_sql = f"CREATE TEMP TABLE {stg} (LIKE {fqtn} INCLUDING DEFAULTS) ON COMMIT DROP"
+        merge_sql = f"INSERT INTO {fqtn} ({cols}) SELECT {cols} FROM {stg} ON CONFLICT ({conflict}) {action}"
+        if not synchronous_commit:
+            create_sql = "SET LOCAL synchronous_commit = off; " + create_sql
+
+        if psycopg is not None:
+            try:
+                with self._psycopg_connect() as conn, conn.cursor() as cur:
+                    cur.execute(create_sql)
+                    self._copy_binary_cur(cur, stg, df)
+                    cur.execute(merge_sql)
+                return
+            except (TypeError, ValueError, psycopg.DataError):
+                # same fallback as insert_dataframe: retry the load as text CSV
+                if psycopg2 is None:
+                    raise
+
+        raw = self.engine.raw_connection()
+        try:
+            with raw.cursor() as cur:
+                cur.execute(create_sql)
+                copy_dataframe_csv(cur, stg, df)
+                cur.execute(merge_sql)
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
 
     def insert_dict(
         self,
@@ -286,6 +679,7 @@ class Postgres:
     ):
         """
         Insert a single dict or list of dicts into a table.
+        Lists of INSERT_DICT_COPY_MIN_ROWS or more go through binary COPY when psycopg 3 is installed.
 
         Example:
             db.insert_dict("teams", {"id": 1, "name": "Arsenal"})
@@ -297,8 +691,15 @@ class Postgres:
         if not data:
             return  # nothing to insert
 
-        metadata = MetaData(schema=schema)
-        table = Table(table_name, metadata, autoload_with=self.engine)
+        if psycopg is not None and len(data) >= INSERT_DICT_COPY_MIN_ROWS:
+            fqtn = f'"{schema}"."{table_name}"' if schema else f'"{table_name}"'
+            try:
+                self._copy_dicts(fqtn, data)
+                return
+            except (TypeError, ValueError, psycopg.DataError):
+                pass  # rolled back; take the executemany path below
+
+        table = self._table(table_name, schema)
 
         with self.engine.begin() as conn:
             conn.execute(table.insert(), data)
@@ -328,6 +729,11 @@ class Postgres:
         with self.engine.begin() as conn:
             conn.exec_driver_sql(sql)
 
+        with self._tbl_lock:
+            tbl = self._tbl_cache.pop((schema, table_name), None)
+            if tbl is not None:
+                self._reflected.remove(tbl)
+
     def create_table_v2(
         self,
         table_name: str,
@@ -407,9 +813,49 @@ class Postgres:
             if not cur.returns_rows:
                 # Non-SELECT; nothing to return as DataFrame
                 return pd.DataFrame()
-            # Use mappings() to get dict-like rows; this preserves column names cleanly
-            rows = cur.mappings().all()
-            return pd.DataFrame(rows)
+            # plain tuple rows + the column list once: no per-row mapping/dict to build and re-parse
+            return pd.DataFrame.from_records(cur.fetchall(), columns=list(cur.keys()))
+
+    def query_df_large(
+        self,
+        sql: str,
+        params: Optional[Union[Dict[str, Any], Tuple[Any, ...]]] = None,
+        *,
+        batch_rows: int = 100_000,
+    ) -> pd.DataFrame:
+        """
+        query_df for big results.
+
+        - connectorx (if installed, and no params): decodes the result directly into columns,
+          no Python row objects at all.
+        - Otherwise a server-side (named) cursor: rows arrive batch_rows at a time and each
+          batch becomes a frame, so the full tuple list is never held at once.
+        """
+        if connectorx is not None and not params:
+            return connectorx.read_sql(self._psycopg_conninfo(), sql, return_type="pandas")
+
+        raw = self.engine.raw_connection()
+        try:
+            parts: List[pd.DataFrame] = []
+            with raw.cursor(name=f"query_df_{threading.get_ident()}") as cur:
+                cur.itersize = batch_rows
+                cur.execute(sql, params)
+                while True:
+                    rows = cur.fetchmany(batch_rows)
+                    # a named cursor only has a description after the first fetch
+                    cols = [d[0] for d in cur.description]
+                    if not rows:
+                        break
+                    parts.append(pd.DataFrame.from_records(rows, columns=cols))
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+        if not parts:
+            return pd.DataFrame(columns=cols)
+        return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
 
     def query_all(
         self,
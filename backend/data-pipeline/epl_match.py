@@ -1,14 +1,18 @@
 import os
+import threading
+from functools import lru_cache
 from typing import Dict, Any, Iterable, List, Tuple
-from datetime import datetime
 
+import numpy as np
+import pandas as pd
 from sqlalchemy import (
     create_engine, MetaData, Table, Column, String, Integer, BigInteger,
     Float, DateTime, Boolean, Text
 )
 from sqlalchemy.engine import Engine
-from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
+
+from db_helper import copy_dataframe_csv
 # -------------------------------------------------------------------
 # Connection
 # -------------------------------------------------------------------
@@ -18,10 +22,16 @@ DB_NAME = os.environ.get("DB_NAME")
 DB_USER = os.environ.get("DB_USER")
 DB_PASS = os.environ.get("DB_PASS")
 
+@lru_cache(maxsize=1)
 def get_engine() -> Engine:
 
     url = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    return create_engine(url, pool_pre_ping=True, future=True)
+    # values_plus_batch: batched VALUES for INSERT executemany, execute_batch for UPDATE/DELETE
+    return create_engine(
+        url, pool_pre_ping=True, future=True, pool_size=10, max_overflow=20,
+        executemany_mode="values_plus_batch", insertmanyvalues_page_size=10_000,
+        executemany_batch_page_size=1000,
+    )
 
 # -------------------------------------------------------------------
 # Schema
@@ -110,140 +120,188 @@ match_rosters_data = Table(
 def create_tables(engine: Engine) -> None:
     metadata.create_all(engine)
 
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _ensure_schema(engine: Engine) -> None:
+    """create_tables once per process; the per-batch paths then skip create_all's pg_class probes."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            create_tables(engine)
+            _schema_ready = True
+
 # -------------------------------------------------------------------
 # Helpers: coercion
 # -------------------------------------------------------------------
-def _to_int(v) -> int | None:
-    try:
-        if v is None or v == "" or str(v).lower() == "none":
-            return None
-        return int(float(v))
-    except Exception:
-        return None
-
-def _to_float(v) -> float | None:
-    try:
-        if v is None or v == "" or str(v).lower() == "none":
-            return None
-        return float(v)
-    except Exception:
-        return None
-
-def _to_dt(v) -> datetime | None:
-    try:
-        if not v:
-            return None
-        # API provides "YYYY-MM-DD HH:MM:SS" (UTC)
-        return datetime.strptime(v, "%Y-%m-%d %H:%M:%S")
-    except Exception:
-        return None
+# API provides "YYYY-MM-DD HH:MM:SS" (UTC)
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Column-oriented buffers: column name -> values
+Columns = Dict[str, List[Any]]
+
+def _new_columns(table: Table) -> Columns:
+    return {c.name: [] for c in table.columns}
+
+def _extend_columns(acc: Columns, cols: Columns) -> None:
+    for name, values in cols.items():
+        acc[name].extend(values)
+
+def _coerce_frame(table: Table, cols: Columns) -> pd.DataFrame:
+    """
+    Build a DataFrame straight from raw flattened columns and coerce it to the table's
+    column types column by column: unparseable/empty values become NULL.
+    """
+    df = pd.DataFrame(cols, columns=[c.name for c in table.columns])
+    for col in table.columns:
+        if isinstance(col.type, Integer):  # BigInteger included
+            # int(float(v)) semantics: "12.0" -> 12
+            df[col.name] = np.trunc(pd.to_numeric(df[col.name], errors="coerce")).astype("Int64")
+        elif isinstance(col.type, Float):
+            df[col.name] = pd.to_numeric(df[col.name], errors="coerce").astype("float64")
+        elif isinstance(col.type, DateTime):
+            df[col.name] = pd.to_datetime(df[col.name], format=DATE_FORMAT, errors="coerce")
+    return df
 
 # -------------------------------------------------------------------
-# Flatteners: transform one API match blob -> rows for each table
+# Flatteners: transform one API match blob -> raw rows/columns for each table
+# (types are coerced per column afterwards, see _coerce_frame)
 # -------------------------------------------------------------------
 def _flatten_match_info(mi: Dict[str, Any]) -> Dict[str, Any]:
     return {
-        "match_id": _to_int(mi.get("id")),
-        "fid": _to_int(mi.get("fid")),
-        "home_team_id": _to_int(mi.get("h")),
-        "away_team_id": _to_int(mi.get("a")),
-        "date_utc": _to_dt(mi.get("date")),
-        "league_id": _to_int(mi.get("league_id")),
-        "season": _to_int(mi.get("season")),
-        "home_goals": _to_int(mi.get("h_goals")),
-        "away_goals": _to_int(mi.get("a_goals")),
+        "match_id": mi.get("id"),
+        "fid": mi.get("fid"),
+        "home_team_id": mi.get("h"),
+        "away_team_id": mi.get("a"),
+        "date_utc": mi.get("date"),
+        "league_id": mi.get("league_id"),
+        "season": mi.get("season"),
+        "home_goals": mi.get("h_goals"),
+        "away_goals": mi.get("a_goals"),
         "team_h": mi.get("team_h"),
         "team_a": mi.get("team_a"),
-        "home_xg": _to_float(mi.get("h_xg")),
-        "away_xg": _to_float(mi.get("a_xg")),
-        "home_win_prob": _to_float(mi.get("h_w")),
-        "home_draw_prob": _to_float(mi.get("h_d")),
-        "home_lose_prob": _to_float(mi.get("h_l")),
+        "home_xg": mi.get("h_xg"),
+        "away_xg": mi.get("a_xg"),
+        "home_win_prob": mi.get("h_w"),
+        "home_draw_prob": mi.get("h_d"),
+        "home_lose_prob": mi.get("h_l"),
         "league": mi.get("league"),
-        "home_shots": _to_int(mi.get("h_shot")),
-        "away_shots": _to_int(mi.get("a_shot")),
-        "home_shots_on_target": _to_int(mi.get("h_shotOnTarget")),
-        "away_shots_on_target": _to_int(mi.get("a_shotOnTarget")),
-        "home_deep": _to_int(mi.get("h_deep")),
-        "away_deep": _to_int(mi.get("a_deep")),
-        "away_ppda": _to_float(mi.get("a_ppda")),
-        "home_ppda": _to_float(mi.get("h_ppda")),
+        "home_shots": mi.get("h_shot"),
+        "away_shots": mi.get("a_shot"),
+        "home_shots_on_target": mi.get("h_shotOnTarget"),
+        "away_shots_on_target": mi.get("a_shotOnTarget"),
+        "home_deep": mi.get("h_deep"),
+        "away_deep": mi.get("a_deep"),
+        "away_ppda": mi.get("a_ppda"),
+        "home_ppda": mi.get("h_ppda"),
     }
 
-def _flatten_shots(sd: Dict[str, Any]) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    for side in ("h", "a"):
-        for shot in sd.get(side, []):
-            rows.append({
-                "shot_id": _to_int(shot.get("id")),
-                "match_id": _to_int(shot.get("match_id")),
-                "minute": _to_int(shot.get("minute")),
-                "result": shot.get("result"),
-                "X": _to_float(shot.get("X")),
-                "Y": _to_float(shot.get("Y")),
-                "xG": _to_float(shot.get("xG")),
-                "player": shot.get("player"),
-                "player_id": _to_int(shot.get("player_id")),
-                "situation": shot.get("situation"),
-                "season": _to_int(shot.get("season")),
-                "shot_type": shot.get("shotType"),
-                "team_side": side,
-                "home_team": shot.get("h_team"),
-                "away_team": shot.get("a_team"),
-                "home_goals": _to_int(shot.get("h_goals")),
-                "away_goals": _to_int(shot.get("a_goals")),
-                "date_utc": _to_dt(shot.get("date")),
-                "player_assisted": shot.get("player_assisted"),
-                "last_action": shot.get("lastAction"),
-            })
-    return rows
-
-def _flatten_rosters(rd: Dict[str, Any], match_id: int) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    for side in ("h", "a"):
-        for _, p in (rd.get(side) or {}).items():
-            rows.append({
-                "appearance_id": _to_int(p.get("id")),
-                "match_id": match_id,
-                "team_side": side,
-                "player_id": _to_int(p.get("player_id")),
-                "team_id": _to_int(p.get("team_id")),
-                "player": p.get("player"),
-                "position": p.get("position"),
-                "position_order": _to_int(p.get("positionOrder")),
-                "time_played": _to_int(p.get("time")),
-                "goals": _to_int(p.get("goals")),
-                "own_goals": _to_int(p.get("own_goals")),
-                "shots": _to_int(p.get("shots")),
-                "xG": _to_float(p.get("xG")),
-                "key_passes": _to_int(p.get("key_passes")),
-                "assists": _to_int(p.get("assists")),
-                "xA": _to_float(p.get("xA")),
-                "xGChain": _to_float(p.get("xGChain")),
-                "xGBuildup": _to_float(p.get("xGBuildup")),
-                "yellow_card": _to_int(p.get("yellow_card")),
-                "red_card": _to_int(p.get("red_card")),
-                "roster_in": _to_int(p.get("roster_in")),
-                "roster_out": _to_int(p.get("roster_out")),
-            })
-    return rows
+# (table column, API key) for the per-row fields of each list payload
+_SHOT_FIELDS = (
+    ("shot_id", "id"), ("match_id", "match_id"), ("minute", "minute"), ("result", "result"),
+    ("X", "X"), ("Y", "Y"), ("xG", "xG"), ("player", "player"), ("player_id", "player_id"),
+    ("situation", "situation"), ("season", "season"), ("shot_type", "shotType"),
+    ("home_team", "h_team"), ("away_team", "a_team"), ("home_goals", "h_goals"),
+    ("away_goals", "a_goals"), ("date_utc", "date"), ("player_assisted", "player_assisted"),
+    ("last_action", "lastAction"),
+)
+
+_ROSTER_FIELDS = (
+    ("appearance_id", "id"), ("player_id", "player_id"), ("team_id", "team_id"),
+    ("player", "player"), ("position", "position"), ("position_order", "positionOrder"),
+    ("time_played", "time"), ("goals", "goals"), ("own_goals", "own_goals"), ("shots", "shots"),
+    ("xG", "xG"), ("key_passes", "key_passes"), ("assists", "assists"), ("xA", "xA"),
+    ("xGChain", "xGChain"), ("xGBuildup", "xGBuildup"), ("yellow_card", "yellow_card"),
+    ("red_card", "red_card"), ("roster_in", "roster_in"), ("roster_out", "roster_out"),
+)
+
+def _flatten_shots(sd: Dict[str, Any]) -> Columns:
+    sides = [(side, sd.get(side) or []) for side in ("h", "a")]
+    n = sum(len(items) for _, items in sides)
+    # pre-sized column lists instead of one dict per shot
+    cols: Columns = {c.name: [None] * n for c in shots_data.columns}
+    i = 0
+    for side, shots in sides:
+        for shot in shots:
+            for col, key in _SHOT_FIELDS:
+                cols[col][i] = shot.get(key)
+            cols["team_side"][i] = side
+            i += 1
+    return cols
+
+def _flatten_rosters(rd: Dict[str, Any], match_id: Any) -> Columns:
+    sides = [(side, (rd.get(side) or {}).values()) for side in ("h", "a")]
+    n = sum(len(items) for _, items in sides)
+    cols: Columns = {c.name: [None] * n for c in match_rosters_data.columns}
+    cols["match_id"] = [match_id] * n
+    i = 0
+    for side, players in sides:
+        for p in players:
+            for col, key in _ROSTER_FIELDS:
+                cols[col][i] = p.get(key)
+            cols["team_side"][i] = side
+            i += 1
+    return cols
 
 # -------------------------------------------------------------------
 # Upsert helpers
 # -------------------------------------------------------------------
-def _upsert_rows(engine: Engine, table: Table, rows: List[Dict[str, Any]], pk_cols: Tuple[str, ...]) -> int:
-    if not rows:
-        return 0
+def _upsert_sql(table: Table, pk_cols: Tuple[str, ...]) -> Tuple[List[str], str, str]:
+    """(column names, CREATE TEMP staging SQL, merge SQL) for one table."""
+    cols = [c.name for c in table.columns]
+    col_sql = ", ".join(f'"{c}"' for c in cols)
     # columns to update = all except PKs
-    update_cols = {c.name for c in table.columns} - set(pk_cols)
-    stmt = pg_insert(table).values(rows)
-    do_update = stmt.on_conflict_do_update(
-        index_elements=list(pk_cols),
-        set_={c: getattr(stmt.excluded, c) for c in update_cols}
+    set_sql = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in cols if c not in pk_cols)
+    pk_sql = ", ".join(f'"{c}"' for c in pk_cols)
+    stg = f'"stg_{table.name}"'
+    create_sql = f'CREATE TEMP TABLE {stg} (LIKE "{table.name}" INCLUDING DEFAULTS) ON COMMIT DROP'
+    merge_sql = (
+        f'INSERT INTO "{table.name}" ({col_sql}) SELECT {col_sql} FROM {stg} '
+        f'ON CONFLICT ({pk_sql}) DO UPDATE SET {set_sql}'
     )
+    return cols, create_sql, merge_sql
+
+# tables are static: build their statements once at import, in upsert order
+_UPSERT_TABLES: Tuple[Tuple[Table, Tuple[str, ...]], ...] = (
+    (match_info, ("match_id",)),
+    (shots_data, ("shot_id",)),
+    (match_rosters_data, ("appearance_id",)),
+)
+_UPSERT_SQL = {table.name: _upsert_sql(table, pk) for table, pk in _UPSERT_TABLES}
+
+def _upsert_all(engine: Engine, mi_cols: Columns, shot_cols: Columns, roster_cols: Columns) -> None:
+    """
+    COPY each table's frame into a temp staging table, then merge them all with
+    INSERT ... SELECT ... ON CONFLICT DO UPDATE. One transaction on one pooled connection;
+    the staging DDL and the merges each go out as a single multi-statement round trip.
+    """
+    cols_by_table = {
+        match_info.name: mi_cols,
+        shots_data.name: shot_cols,
+        match_rosters_data.name: roster_cols,
+    }
+    frames = []
+    for table, pk in _UPSERT_TABLES:
+        df = _coerce_frame(table, cols_by_table[table.name])
+        if df.empty:
+            continue
+        # a key repeated within one INSERT fails the whole merge ("cannot affect row a second time")
+        frames.append((table, df.drop_duplicates(subset=list(pk), keep="last")))
+    if not frames:
+        return
+
     with engine.begin() as conn:
-        result = conn.execute(do_update)
-        return result.rowcount or 0
+        conn.exec_driver_sql("; ".join(_UPSERT_SQL[t.name][1] for t, _ in frames))
+        # DBAPI cursor on the same connection/transaction as the merges
+        cur = conn.connection.cursor()
+        try:
+            for table, df in frames:
+                copy_dataframe_csv(cur, f'"stg_{table.name}"', df[_UPSERT_SQL[table.name][0]])
+        finally:
+            cur.close()
+        conn.exec_driver_sql("; ".join(_UPSERT_SQL[t.name][2] for t, _ in frames))
 
 # -------------------------------------------------------------------
 # Public API
@@ -254,33 +312,22 @@ def init_matches_all(api_payload: Dict[str, Any]) -> None:
     api_payload: dict keyed by match URL (or any key) -> { shots_data, match_info, rosters_data }
     """
     engine = get_engine()
-    create_tables(engine)
+    _ensure_schema(engine)
 
-    mi_rows: List[Dict[str, Any]] = []
-    shot_rows: List[Dict[str, Any]] = []
-    roster_rows: List[Dict[str, Any]] = []
+    mi_cols = _new_columns(match_info)
+    shot_cols = _new_columns(shots_data)
+    roster_cols = _new_columns(match_rosters_data)
 
     for _, blob in api_payload.items():
         mi = _flatten_match_info(blob["match_info"])
-        mi_rows.append(mi)
-        shot_rows.extend(_flatten_shots(blob["shots_data"]))
-        roster_rows.extend(_flatten_rosters(blob["rosters_data"], mi["match_id"]))
-
-    _upsert_rows(engine, match_info, mi_rows, ("match_id",))
-    _upsert_rows(engine, shots_data, shot_rows, ("shot_id",))
-    _upsert_rows(engine, match_rosters_data, roster_rows, ("appearance_id",))
+        for name, value in mi.items():
+            mi_cols[name].append(value)
+        _extend_columns(shot_cols, _flatten_shots(blob["shots_data"]))
+        _extend_columns(roster_cols, _flatten_rosters(blob["rosters_data"], mi["match_id"]))
 
-def upsert_match(api_match_blob: Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]] | Dict[str, Any]) -> None:
-    """
-    Upsert a single match.
-
-    Accepts either:
-      - Tuple form (preferred): (shots_data, match_info, rosters_data)
-      - Legacy dict form: {"shots_data": ..., "match_info": ..., "rosters_data": ...}
-    """
-    engine = get_engine()
-    create_tables(engine)
+    _upsert_all(engine, mi_cols, shot_cols, roster_cols)
 
+def _unpack_blob(api_match_blob: Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]] | Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
     # Unpack payload (tuple preferred; dict supported for compatibility)
     if isinstance(api_match_blob, (tuple, list)):
         if len(api_match_blob) != 3:
@@ -292,13 +339,39 @@ def upsert_match(api_match_blob: Tuple[Dict[str, Any], Dict[str, Any], Dict[str,
         rosters_d = api_match_blob["rosters_data"]
     else:
         raise TypeError("api_match_blob must be a (shots_data, match_info, rosters_data) tuple or a dict with those keys.")
+    return shots_d, match_i, rosters_d
+
+def upsert_match(api_match_blob: Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]] | Dict[str, Any]) -> None:
+    """
+    Upsert a single match.
+
+    Accepts either:
+      - Tuple form (preferred): (shots_data, match_info, rosters_data)
+      - Legacy dict form: {"shots_data": ..., "match_info": ..., "rosters_data": ...}
+    """
+    upsert_matches([api_match_blob])
+
+def upsert_matches(api_match_blobs: Iterable[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]] | Dict[str, Any]]) -> int:
+    """
+    Upsert a batch of matches with one COPY + INSERT ... ON CONFLICT merge per table.
+    Each blob takes the same shapes as `upsert_match`. Returns the number of matches.
+    """
+    engine = get_engine()
+    _ensure_schema(engine)
+
+    mi_cols = _new_columns(match_info)
+    shot_cols = _new_columns(shots_data)
+    roster_cols = _new_columns(match_rosters_data)
 
-    # Flatten → rows
-    mi = _flatten_match_info(match_i)
-    shots = _flatten_shots(shots_d)
-    rosters = _flatten_rosters(rosters_d, mi["match_id"])
+    # Flatten → columns
+    for blob in api_match_blobs:
+        shots_d, match_i, rosters_d = _unpack_blob(blob)
+        mi = _flatten_match_info(match_i)
+        for name, value in mi.items():
+            mi_cols[name].append(value)
+        _extend_columns(shot_cols, _flatten_shots(shots_d))
+        _extend_columns(roster_cols, _flatten_rosters(rosters_d, mi["match_id"]))
 
-    # Upsert
-    _upsert_rows(engine, match_info, [mi], ("match_id",))
-    _upsert_rows(engine, shots_data, shots, ("shot_id",))
-    _upsert_rows(engine, match_rosters_data, rosters, ("appearance_id",))
\ No newline at end of file
+    # Coerce per column → upsert all three tables in one transaction
+    _upsert_all(engine, mi_cols, shot_cols, roster_cols)
+    return len(mi_cols["match_id"])
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
 import ast
+import os
 import re
-from typing import Dict, Any, Iterable, Tuple
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
 import pandas as pd
-from sqlalchemy.engine import Engine
+from psycopg2.extras import execute_values
+from sqlalchemy.engine import Connection, Engine
+
+from db_helper import to_sql_copy
+from install_sql_func import PLAYER_PID_INDEXES
 
 # ------------------ key flattening helpers ------------------
 
+_UNNAMED_RE = re.compile(r"^Unnamed:\s*\d+_level_0$")
+_NONWORD_RE = re.compile(r"[^\w]+")
+_MULTI_UNDER_RE = re.compile(r"_+")
+
 def _parse_key(k: str) -> Tuple[str, ...] | None:
     """Parse a string that looks like a tuple key: "('Foo','Bar')" -> ('Foo','Bar')."""
     if isinstance(k, str) and k.startswith("(") and k.endswith(")"):
@@ -32,7 +43,7 @@ def _clean_key(k: str) -> str:
         if (
             len(t) >= 2
             and isinstance(t[0], str)
-            and re.match(r"^Unnamed:\s*\d+_level_0$", t[0])
+            and _UNNAMED_RE.match(t[0])
         ):
             name = str(t[1] or "")
         elif len(t) >= 2 and t[1] == "Squad":
@@ -49,20 +60,37 @@ def _clean_key(k: str) -> str:
     # sanitize, then LOWERCASE
     name = name.strip()
     name = name.replace("%", "pct").replace("+", "plus")
-    name = re.sub(r"[^\w]+", "_", name)
-    name = re.sub(r"_+", "_", name).strip("_")
+    name = _NONWORD_RE.sub("_", name)
+    name = _MULTI_UNDER_RE.sub("_", name).strip("_")
     return name.lower()
 
 
-def _flatten_one(rec: Dict[str, Any]) -> Dict[str, Any]:
-    """Flatten one record's keys."""
-    out = {}
-    for k, v in rec.items():
-        out[_clean_key(k)] = v
-    return out
-
-def _flatten_many(rows: Iterable[Dict[str, Any]]) -> pd.DataFrame:
-    return pd.DataFrame([_flatten_one(r) for r in rows])
+def _flatten_many(
+    rows: Iterable[Dict[str, Any]],
+    drop_keys: frozenset = frozenset(),
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Build the frame from the raw records, then clean the column keys once per column
+    (not once per cell). Keys that clean to the same name collapse like they would in a
+    dict: first position, last value. Cleaned names in drop_keys are left out.
+    With columns (see _block_columns), the frame is reindexed to exactly that layout.
+    """
+    df = pd.DataFrame.from_records(list(rows))
+    last: Dict[str, int] = {}
+    for i, name in enumerate(_clean_key(c) for c in df.columns):
+        if name not in drop_keys:
+            last[name] = i
+    df = df.iloc[:, list(last.values())]
+    df.columns = list(last.keys())
+    return df if columns is None else df.reindex(columns=columns)
+
+def _block_columns(rows: Iterable[Dict[str, Any]], drop_keys: frozenset = frozenset()) -> List[str]:
+    """Cleaned column names of a whole block, in _flatten_many's order, from the keys alone."""
+    raw: Dict[Any, None] = {}
+    for r in rows:
+        raw.update(dict.fromkeys(r))
+    return list(dict.fromkeys(n for n in map(_clean_key, raw) if n not in drop_keys))
 
 
 # ------------------ team normalization ------------------
@@ -77,19 +105,52 @@ _CANON_REPLACEMENTS = {
     "Leeds United": "Leeds",
 }
 
+# _CANON_REPLACEMENTS applied in order, folded into one table for a single regex pass.
+# " Utd" runs first, so "Man Utd" only ever becomes "Man United" and "Leeds Utd" goes on
+# to "Leeds"; longest keys first so a full name wins over its " Utd" suffix.
+_CANON_SINGLE_PASS = {
+    "Leeds Utd": "Leeds",
+    "Leeds United": "Leeds",
+    "Nott'ham": "Nottingham",
+    "Man City": "Manchester City",
+    "Wolves": "Wolverhampton Wanderers",
+    "Spurs": "Tottenham",
+    " Utd": " United",
+}
+_CANON_RE = re.compile("|".join(
+    re.escape(k) for k in sorted(_CANON_SINGLE_PASS, key=len, reverse=True)
+))
+
+def _canon_sub(m: re.Match) -> str:
+    return _CANON_SINGLE_PASS[m.group(0)]
+
 def _normalize_text_name(raw: str) -> str:
     """Cheap canonicalizer before DB lookups."""
     if raw is None:
         return raw
     name = raw.strip()
-    if name.lower().startswith("vs "):
+    if name[:3].lower() == "vs ":
         name = name[3:]  # drop "vs "
-    for a, b in _CANON_REPLACEMENTS.items():
-        name = name.replace(a, b)
+    name = _CANON_RE.sub(_canon_sub, name)
     # collapse whitespace
     name = " ".join(name.split())
     return name
 
+def _vector_canonicalize(s: pd.Series, alias_map: Dict[str, str]) -> pd.Series:
+    """
+    Column-wide _normalize_text_name + alias lookup, as pandas string ops instead of
+    Python calls per row. Same steps in the same order.
+    Runs on the distinct names only (~20 teams) and maps the result back onto the rows.
+    """
+    s = s.astype(str)
+    u = pd.Series(s.unique())
+    u = u.str.strip()
+    u = u.mask(u.str.lower().str.startswith("vs "), u.str[3:])
+    u = u.str.replace(_CANON_RE, _canon_sub, regex=True)
+    u = u.str.split().str.join(" ")
+    u = u.str.lower().map(alias_map).fillna(u)
+    return s.map(pd.Series(u.to_numpy(), index=s.unique()))
+
 def _load_team_maps(engine: Engine) -> Tuple[pd.DataFrame, Dict[str, str]]:
     """
     Returns:
@@ -114,7 +175,10 @@ def _attach_team_id(df: pd.DataFrame, teams_df: pd.DataFrame, name_col: str = "S
     df = df.copy()
     if name_col not in df.columns:
         return df
-    df["team_name"] = df[name_col].astype(str).map(_normalize_text_name)
+    names = df[name_col].astype(str)
+    uniq = pd.Index(names.unique())
+    # one _normalize_text_name call per distinct name, not per row
+    df["team_name"] = names.map(pd.Series(uniq.map(_normalize_text_name).to_numpy(), index=uniq))
     df = df.merge(teams_df.rename(columns={"team_name": "team_name"}),
                   on="team_name", how="left") 
     return df
@@ -122,6 +186,136 @@ def _attach_team_id(df: pd.DataFrame, teams_df: pd.DataFrame, name_col: str = "S
 
 # ------------------ main ingest ------------------
 
+def _to_numeric_or_keep(col: pd.Series) -> pd.Series:
+    # to_numeric(errors="ignore"): numeric if the whole column parses, else unchanged
+    try:
+        return pd.to_numeric(col)
+    except (ValueError, TypeError):
+        return col
+
+# known identifier/text columns per block kind: never run through to_numeric
+_TEAM_TEXT_COLS = frozenset({"team_name", "team_id", "team_id_x"})
+_BLOCK_TEXT_COLS: Dict[str, frozenset] = {
+    "team": _TEAM_TEXT_COLS,
+    "vs_team": _TEAM_TEXT_COLS,
+    # player age is fbref's "years-days" string, not a number
+    "players": _TEAM_TEXT_COLS | {"player", "player_id", "nation", "pos", "age"},
+}
+
+def _coerce_numeric(df: pd.DataFrame, text_cols: frozenset) -> pd.DataFrame:
+    """
+    Typed dispatch instead of a blind apply: text columns are left alone, columns that are
+    already numeric are left alone, and only the remaining object columns get a parse try.
+    """
+    for c in df.columns:
+        if c in text_cols or pd.api.types.is_numeric_dtype(df[c]):
+            continue
+        df[c] = _to_numeric_or_keep(df[c])
+    return df
+
+def _normalize_block(
+    df: pd.DataFrame,
+    team_ids: pd.Series,
+    alias_map: Dict[str, str],
+    text_cols: frozenset = frozenset(),
+) -> pd.DataFrame:
+    """
+    squad -> canonical team_name + team_id, in place on the flattened frame. Column layout
+    matches the left merge this replaces: a pre-existing fbref team_id becomes team_id_x and
+    the canonical id is appended as team_id_y.
+    """
+    if "squad" in df.columns:
+        df["team_name"] = _vector_canonicalize(df.pop("squad"), alias_map)
+        ids = df["team_name"].map(team_ids)
+        if "team_id" in df.columns:
+            df.rename(columns={"team_id": "team_id_x"}, inplace=True)
+            df["team_id_y"] = ids
+        else:
+            df["team_id"] = ids
+    df = df.loc[:, ~df.columns.duplicated()].copy()
+    return _coerce_numeric(df, text_cols)
+
+# per-player columns not stored: dropped at flatten time, before numeric coercion
+PLAYER_DROP_KEYS = frozenset({"rk", "matches", "player_link"})
+
+# player_<category> -> its player_id index, same names as install_sql_func's INDEX_STATEMENTS
+_PLAYER_PID_INDEX = dict(PLAYER_PID_INDEXES)
+
+TO_SQL_CHUNKSIZE = int(os.environ.get("TO_SQL_CHUNKSIZE", "1000"))
+_PG_MAX_PARAMS = 65535  # bind parameters per statement
+
+def _write_table(df: pd.DataFrame, name: str, con: Engine | Connection, if_exists: str, *, copy: bool = False) -> None:
+    if copy:
+        # one COPY for the whole frame (to_sql still creates/replaces the table first)
+        df.to_sql(name, con=con, if_exists=if_exists, index=False, method=to_sql_copy)
+        return
+    # multi-row INSERTs; wide frames get smaller chunks to stay under the bind-parameter limit
+    chunksize = max(1, min(TO_SQL_CHUNKSIZE, _PG_MAX_PARAMS // max(1, len(df.columns))))
+    df.to_sql(name, con=con, if_exists=if_exists, index=False, method="multi", chunksize=chunksize)
+
+# rows flattened + written per step, so a block never sits in memory as one full frame
+INGEST_CHUNK_ROWS = int(os.environ.get("FBREF_INGEST_CHUNK_ROWS", "5000"))
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[list]:
+    it = iter(rows)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+def _conform(df: pd.DataFrame, dtypes: pd.Series) -> pd.DataFrame:
+    """
+    Cast a later chunk to the first chunk's dtypes, i.e. to the column types of the table
+    to_sql created: numeric columns are parsed (unparseable cells -> NULL), integer ones
+    stay integers through the nullable Int64 dtype, everything else is written as is.
+    """
+    for c, dt in dtypes.items():
+        s = df[c]
+        if s.dtype == dt:
+            continue
+        if pd.api.types.is_integer_dtype(dt):
+            df[c] = pd.to_numeric(s, errors="coerce").astype("Int64")
+        elif pd.api.types.is_float_dtype(dt):
+            df[c] = pd.to_numeric(s, errors="coerce").astype(dt)
+    return df
+
+def _ingest_rows(
+    rows: Sequence[Dict[str, Any]],
+    name: str,
+    engine: Engine,
+    if_exists: str,
+    team_ids: pd.Series,
+    alias_map: Dict[str, str],
+    *,
+    drop_keys: frozenset = frozenset(),
+    text_cols: frozenset = frozenset(),
+    copy: bool = False,
+    pid_index: Optional[str] = None,
+) -> None:
+    """
+    Flatten/normalize/write one block INGEST_CHUNK_ROWS rows at a time. The column set comes
+    from the keys of the whole block and the dtypes from the first chunk (which creates the
+    table), so every chunk has the same layout. All chunks go out in one transaction: the
+    first honours if_exists, the rest append, and a failure leaves the old table in place.
+    pid_index names the player_id index to (re)create in that transaction: a replace drops it.
+    """
+    columns = _block_columns(rows, drop_keys)
+    if not columns:
+        return
+    dtypes: Optional[pd.Series] = None
+    with engine.begin() as conn:
+        for chunk in _chunks(rows, INGEST_CHUNK_ROWS):
+            df = _flatten_many(chunk, drop_keys=drop_keys, columns=columns)
+            df = _normalize_block(df, team_ids, alias_map, text_cols)
+            if dtypes is None:
+                dtypes = df.dtypes
+            else:
+                df = _conform(df, dtypes)
+            _write_table(df, name, conn, if_exists, copy=copy)
+            if_exists = "append"
+        if pid_index and "player_id" in columns:
+            # get_player_all_stats reads whole rows by player_id, so a plain key index is the
+            # one that helps; an INCLUDE list can't turn SELECT * into an index-only scan
+            conn.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS {pid_index} ON "{name}" ("player_id")')
+
 def ingest_fbref_bundle(
     engine: Engine,
     bundle: Dict[str, Any],
@@ -146,63 +340,28 @@ def ingest_fbref_bundle(
 
     block = bundle[category]
     teams_df, alias_map = _load_team_maps(engine)
-
-    # --- TEAM ---
-    team_rows = block.get("team") or []
-    team_df = _flatten_many(team_rows)
-    if not team_df.empty:
-        if "squad" in team_df.columns:
-
-            team_df["team_name"] = (team_df["squad"]
-                                    .astype(str)
-                                    .map(_normalize_text_name)
-                                    .map(lambda s: alias_map.get(s.lower(), s)))
-
-            team_df.drop(columns=["squad"], inplace=True)
-
-            team_df = team_df.merge(teams_df, on="team_name", how="left")
-    
-
-        team_df = team_df.loc[:, ~team_df.columns.duplicated()]
-        team_df = team_df.apply(pd.to_numeric, errors="ignore")
-        team_table = f"team_{category.replace(' ', '_')}"
-        # team_df.drop(columns=["team_id"], inplace=True)
-        team_df.to_sql(team_table, con=engine, if_exists=if_exists, index=False)
-
-    # --- VS TEAM ---
-    vs_rows = block.get("vs_team") or []
-    vs_df = _flatten_many(vs_rows)
-    if not vs_df.empty:
-        if "squad" in vs_df.columns:
-            vs_df["team_name"] = (vs_df["squad"]
-                                  .astype(str)
-                                  .map(_normalize_text_name)
-                                  .map(lambda s: alias_map.get(s.lower(), s)))
-            vs_df.drop(columns=["squad"], inplace=True)
-            vs_df = vs_df.merge(teams_df, on="team_name", how="left")
-    
-        vs_df = vs_df.loc[:, ~vs_df.columns.duplicated()]
-        vs_df = vs_df.apply(pd.to_numeric, errors="ignore")
-        vs_table = f"vs_team_{category.replace(' ', '_')}"
-        vs_df.to_sql(vs_table, con=engine, if_exists=if_exists, index=False)
-
-    # --- PLAYERS ---
-    players_rows = block.get("players") or []
-    players_df = _flatten_many(players_rows)
-    if not players_df.empty:
-        if "squad" in players_df.columns:
-            players_df["team_name"] = (players_df["squad"]
-                                       .astype(str)
-                                       .map(_normalize_text_name)
-                                       .map(lambda s: alias_map.get(s.lower(), s)))
-            players_df.drop(columns=["squad"], inplace=True)
-            players_df = players_df.merge(teams_df, on="team_name", how="left")
-    
-        players_df = players_df.loc[:, ~players_df.columns.duplicated()]
-        players_df = players_df.apply(pd.to_numeric, errors="ignore")
-        player_table = f"player_{category.replace(' ', '_')}"
-        players_df.drop(columns=["rk","matches","player_link"], inplace=True)
-        players_df.to_sql(player_table, con=engine, if_exists=if_exists, index=False)
+    # team_name -> canonical team_id, a hash lookup instead of a merge per table
+    team_ids = teams_df.drop_duplicates("team_name").set_index("team_name")["team_id"]
+    suffix = category.replace(' ', '_')
+
+    # the three tables are independent: write them concurrently, each on its own pooled connection
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="fbref-ingest") as ex:
+        futures = [
+            # --- TEAM ---
+            ex.submit(_ingest_rows, block.get("team") or [], f"team_{suffix}", engine, if_exists,
+                      team_ids, alias_map, text_cols=_BLOCK_TEXT_COLS["team"]),
+            # --- VS TEAM ---
+            ex.submit(_ingest_rows, block.get("vs_team") or [], f"vs_team_{suffix}", engine, if_exists,
+                      team_ids, alias_map, text_cols=_BLOCK_TEXT_COLS["vs_team"]),
+            # --- PLAYERS ---
+            ex.submit(_ingest_rows, block.get("players") or [], f"player_{suffix}", engine, if_exists,
+                      team_ids, alias_map, drop_keys=PLAYER_DROP_KEYS,
+                      text_cols=_BLOCK_TEXT_COLS["players"], copy=True,
+                      pid_index=_PLAYER_PID_INDEX.get(f"player_{suffix}")),
+        ]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for fut in done:
+            fut.result()  # re-raise the first failure
 
 
 # ------------------ optional: bootstrap alias table ------------------
@@ -229,9 +388,11 @@ def ensure_alias_table(engine: Engine, seeds: Dict[str, str] | None = None) -> N
     with engine.begin() as conn:
         conn.exec_driver_sql(DDL_TEAM_ALIAS)
         if seeds:
-            for alias, canonical in seeds.items():
-                conn.exec_driver_sql(
-                    "INSERT INTO team_alias(alias, team_name) VALUES (%s, %s) "
+            # every seed in a single multi-row INSERT statement
+            with conn.connection.cursor() as cur:
+                execute_values(
+                    cur,
+                    "INSERT INTO team_alias(alias, team_name) VALUES %s "
                     "ON CONFLICT (alias) DO NOTHING;",
-                    (alias, canonical),
+                    list(seeds.items()),
                 )
\ No newline at end of file
@@ -1,23 +1,44 @@
 # fbref_remote.py
+import atexit
 import os
+from functools import lru_cache
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from ScraperFC.fbref import FBref as _FBref
 
-class FBrefRemote(_FBref):
-    def _driver_init(self) -> None:
-        opts = Options()
-        opts.add_argument("--headless=new")
-        opts.add_argument("--disable-dev-shm-usage")
-        opts.add_argument("--no-first-run")
-        opts.add_argument("--no-default-browser-check")
+@lru_cache(maxsize=1)
+def _shared_driver() -> webdriver.Remote:
+    # one remote browser session per process, reused by every scrape; quit at exit
+    opts = Options()
+    opts.add_argument("--headless=new")
+    opts.add_argument("--disable-dev-shm-usage")
+    opts.add_argument("--no-first-run")
+    opts.add_argument("--no-default-browser-check")
 
-        remote = os.getenv("SELENIUM_URL", "http://localhost:4444")
-        self.driver = webdriver.Remote(command_executor=remote, options=opts)
-        self.driver.set_page_load_timeout(60)
+    remote = os.getenv("SELENIUM_URL", "http://localhost:4444")
+    driver = webdriver.Remote(command_executor=remote, options=opts)
+    driver.set_page_load_timeout(60)
+    return driver
 
-    def _driver_close(self) -> None:
+@atexit.register
+def _quit_shared_driver() -> None:
+    if _shared_driver.cache_info().currsize:
         try:
-            self.driver.quit()
+            _shared_driver().quit()
         except Exception:
             pass
+        _shared_driver.cache_clear()
+
+class FBrefRemote(_FBref):
+    def _driver_init(self) -> None:
+        driver = _shared_driver()
+        try:
+            driver.current_url  # session still alive on the grid?
+        except Exception:
+            _quit_shared_driver()
+            driver = _shared_driver()
+        self.driver = driver
+
+    def _driver_close(self) -> None:
+        # the session is shared across scrapes; _quit_shared_driver closes it at exit
+        pass
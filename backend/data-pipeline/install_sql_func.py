@@ -15,11 +15,38 @@ RETURNS text
 LANGUAGE sql
 IMMUTABLE
 PARALLEL SAFE
+STRICT
 AS $$ SELECT unaccent('public.unaccent', $1) $$;
 """
 
-SQL_CREATE_GET_FBREF_TEAM_JSON_ALL = r"""
-CREATE OR REPLACE FUNCTION public.get_fbref_team_json_all()
+# LEAKPROOF can only be set by a superuser; applied best-effort on top of the function above
+SQL_IMM_UNACCENT_LEAKPROOF = "ALTER FUNCTION public.imm_unaccent(text) LEAKPROOF;"
+
+FBREF_CATEGORIES = (
+    "standard", "goalkeeping", "shooting", "passing",
+    "pass_types", "goal_and_shot_creation", "defensive", "possession",
+)
+FBREF_TEAM_TABLES = tuple(f"{prefix}_{c}" for prefix in ("team", "vs_team") for c in FBREF_CATEGORIES)
+
+# Normalized join key, computed once per row on write instead of on every join. The team
+# tables are recreated by each ingest, so this is (re)applied before the JSON builders run.
+# Guarded per table: a category the ingest skipped must not fail the whole batch. Anything
+# that serializes these rows whole (to_jsonb(t)) has to drop name_norm again.
+SQL_ADD_TEAM_NAME_NORM = "\n".join(
+    f"""DO $$ BEGIN
+  IF to_regclass('public."{t}"') IS NOT NULL THEN
+    ALTER TABLE public."{t}" ADD COLUMN IF NOT EXISTS name_norm text
+      GENERATED ALWAYS AS (lower(public.imm_unaccent(team_name))) STORED;
+    CREATE INDEX IF NOT EXISTS "idx_{t}_name_norm" ON public."{t}" (name_norm);
+  END IF;
+END $$;"""
+    for t in FBREF_TEAM_TABLES
+)
+
+# The two builders below do the full 8-way join; the API-facing get_* functions read the
+# cached payload that refresh_fbref_json_cache() stores after each fbref ingest.
+SQL_CREATE_BUILD_FBREF_TEAM_JSON_ALL = r"""
+CREATE OR REPLACE FUNCTION public.build_fbref_team_json_all()
 RETURNS jsonb
 LANGUAGE sql
 STABLE
@@ -27,37 +54,37 @@ AS $$
 WITH base AS (
   SELECT DISTINCT ON (name_norm) name_norm, team_name
   FROM (
-    SELECT lower(imm_unaccent(team_name)) AS name_norm, team_name FROM team_standard
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM team_goalkeeping
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM team_shooting
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM team_passing
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM team_pass_types
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM team_goal_and_shot_creation
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM team_defensive
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM team_possession
+    SELECT name_norm, team_name FROM team_standard
+    UNION ALL SELECT name_norm, team_name FROM team_goalkeeping
+    UNION ALL SELECT name_norm, team_name FROM team_shooting
+    UNION ALL SELECT name_norm, team_name FROM team_passing
+    UNION ALL SELECT name_norm, team_name FROM team_pass_types
+    UNION ALL SELECT name_norm, team_name FROM team_goal_and_shot_creation
+    UNION ALL SELECT name_norm, team_name FROM team_defensive
+    UNION ALL SELECT name_norm, team_name FROM team_possession
   ) u
   ORDER BY name_norm, team_name
 ),
 joined AS (
   SELECT
     b.team_name,
-    CASE WHEN ts.team_name  IS NULL THEN NULL ELSE to_jsonb(ts)  - 'team_name' END AS standard,
-    CASE WHEN tg.team_name  IS NULL THEN NULL ELSE to_jsonb(tg)  - 'team_name' END AS goalkeeping,
-    CASE WHEN tsh.team_name IS NULL THEN NULL ELSE to_jsonb(tsh) - 'team_name' END AS shooting,
-    CASE WHEN tp.team_name  IS NULL THEN NULL ELSE to_jsonb(tp)  - 'team_name' END AS passing,
-    CASE WHEN tpt.team_name IS NULL THEN NULL ELSE to_jsonb(tpt) - 'team_name' END AS pass_types,
-    CASE WHEN tgc.team_name IS NULL THEN NULL ELSE to_jsonb(tgc) - 'team_name' END AS goal_and_shot_creation,
-    CASE WHEN td.team_name  IS NULL THEN NULL ELSE to_jsonb(td)  - 'team_name' END AS defensive,
-    CASE WHEN tpo.team_name IS NULL THEN NULL ELSE to_jsonb(tpo) - 'team_name' END AS possession
+    CASE WHEN ts.team_name  IS NULL THEN NULL ELSE to_jsonb(ts)  - '{team_name,name_norm}'::text[] END AS standard,
+    CASE WHEN tg.team_name  IS NULL THEN NULL ELSE to_jsonb(tg)  - '{team_name,name_norm}'::text[] END AS goalkeeping,
+    CASE WHEN tsh.team_name IS NULL THEN NULL ELSE to_jsonb(tsh) - '{team_name,name_norm}'::text[] END AS shooting,
+    CASE WHEN tp.team_name  IS NULL THEN NULL ELSE to_jsonb(tp)  - '{team_name,name_norm}'::text[] END AS passing,
+    CASE WHEN tpt.team_name IS NULL THEN NULL ELSE to_jsonb(tpt) - '{team_name,name_norm}'::text[] END AS pass_types,
+    CASE WHEN tgc.team_name IS NULL THEN NULL ELSE to_jsonb(tgc) - '{team_name,name_norm}'::text[] END AS goal_and_shot_creation,
+    CASE WHEN td.team_name  IS NULL THEN NULL ELSE to_jsonb(td)  - '{team_name,name_norm}'::text[] END AS defensive,
+    CASE WHEN tpo.team_name IS NULL THEN NULL ELSE to_jsonb(tpo) - '{team_name,name_norm}'::text[] END AS possession
   FROM base b
-  LEFT JOIN team_standard                ts  ON lower(imm_unaccent(ts.team_name))  = b.name_norm
-  LEFT JOIN team_goalkeeping             tg  ON lower(imm_unaccent(tg.team_name))  = b.name_norm
-  LEFT JOIN team_shooting               tsh  ON lower(imm_unaccent(tsh.team_name)) = b.name_norm
-  LEFT JOIN team_passing                 tp  ON lower(imm_unaccent(tp.team_name))  = b.name_norm
-  LEFT JOIN team_pass_types             tpt  ON lower(imm_unaccent(tpt.team_name)) = b.name_norm
-  LEFT JOIN team_goal_and_shot_creation tgc  ON lower(imm_unaccent(tgc.team_name)) = b.name_norm
-  LEFT JOIN team_defensive               td  ON lower(imm_unaccent(td.team_name))  = b.name_norm
-  LEFT JOIN team_possession             tpo  ON lower(imm_unaccent(tpo.team_name)) = b.name_norm
+  LEFT JOIN team_standard                ts  ON ts.name_norm  = b.name_norm
+  LEFT JOIN team_goalkeeping             tg  ON tg.name_norm  = b.name_norm
+  LEFT JOIN team_shooting               tsh  ON tsh.name_norm = b.name_norm
+  LEFT JOIN team_passing                 tp  ON tp.name_norm  = b.name_norm
+  LEFT JOIN team_pass_types             tpt  ON tpt.name_norm = b.name_norm
+  LEFT JOIN team_goal_and_shot_creation tgc  ON tgc.name_norm = b.name_norm
+  LEFT JOIN team_defensive               td  ON td.name_norm  = b.name_norm
+  LEFT JOIN team_possession             tpo  ON tpo.name_norm = b.name_norm
 )
 SELECT jsonb_object_agg(
   team_name,
@@ -78,8 +105,8 @@ FROM joined;
 $$;
 """
 
-SQL_CREATE_GET_FBREF_VS_TEAM_JSON_ALL = r"""
-CREATE OR REPLACE FUNCTION public.get_fbref_vs_team_json_all()
+SQL_CREATE_BUILD_FBREF_VS_TEAM_JSON_ALL = r"""
+CREATE OR REPLACE FUNCTION public.build_fbref_vs_team_json_all()
 RETURNS jsonb
 LANGUAGE sql
 STABLE
@@ -87,37 +114,37 @@ AS $$
 WITH base AS (
   SELECT DISTINCT ON (name_norm) name_norm, team_name
   FROM (
-    SELECT lower(imm_unaccent(team_name)) AS name_norm, team_name FROM vs_team_standard
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM vs_team_goalkeeping
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM vs_team_shooting
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM vs_team_passing
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM vs_team_pass_types
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM vs_team_goal_and_shot_creation
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM vs_team_defensive
-    UNION SELECT lower(imm_unaccent(team_name)), team_name FROM vs_team_possession
+    SELECT name_norm, team_name FROM vs_team_standard
+    UNION ALL SELECT name_norm, team_name FROM vs_team_goalkeeping
+    UNION ALL SELECT name_norm, team_name FROM vs_team_shooting
+    UNION ALL SELECT name_norm, team_name FROM vs_team_passing
+    UNION ALL SELECT name_norm, team_name FROM vs_team_pass_types
+    UNION ALL SELECT name_norm, team_name FROM vs_team_goal_and_shot_creation
+    UNION ALL SELECT name_norm, team_name FROM vs_team_defensive
+    UNION ALL SELECT name_norm, team_name FROM vs_team_possession
   ) u
   ORDER BY name_norm, team_name
 ),
 joined AS (
   SELECT
     b.team_name,
-    CASE WHEN vts.team_name  IS NULL THEN NULL ELSE to_jsonb(vts)  - 'team_name' END AS standard,
-    CASE WHEN vtg.team_name  IS NULL THEN NULL ELSE to_jsonb(vtg)  - 'team_name' END AS goalkeeping,
-    CASE WHEN vtsh.team_name IS NULL THEN NULL ELSE to_jsonb(vtsh) - 'team_name' END AS shooting,
-    CASE WHEN vtp.team_name  IS NULL THEN NULL ELSE to_jsonb(vtp)  - 'team_name' END AS passing,
-    CASE WHEN vtpt.team_name IS NULL THEN NULL ELSE to_jsonb(vtpt) - 'team_name' END AS pass_types,
-    CASE WHEN vtgc.team_name IS NULL THEN NULL ELSE to_jsonb(vtgc) - 'team_name' END AS goal_and_shot_creation,
-    CASE WHEN vtd.team_name  IS NULL THEN NULL ELSE to_jsonb(vtd)  - 'team_name' END AS defensive,
-    CASE WHEN vtpo.team_name IS NULL THEN NULL ELSE to_jsonb(vtpo) - 'team_name' END AS possession
+    CASE WHEN vts.team_name  IS NULL THEN NULL ELSE to_jsonb(vts)  - '{team_name,name_norm}'::text[] END AS standard,
+    CASE WHEN vtg.team_name  IS NULL THEN NULL ELSE to_jsonb(vtg)  - '{team_name,name_norm}'::text[] END AS goalkeeping,
+    CASE WHEN vtsh.team_name IS NULL THEN NULL ELSE to_jsonb(vtsh) - '{team_name,name_norm}'::text[] END AS shooting,
+    CASE WHEN vtp.team_name  IS NULL THEN NULL ELSE to_jsonb(vtp)  - '{team_name,name_norm}'::text[] END AS passing,
+    CASE WHEN vtpt.team_name IS NULL THEN NULL ELSE to_jsonb(vtpt) - '{team_name,name_norm}'::text[] END AS pass_types,
+    CASE WHEN vtgc.team_name IS NULL THEN NULL ELSE to_jsonb(vtgc) - '{team_name,name_norm}'::text[] END AS goal_and_shot_creation,
+    CASE WHEN vtd.team_name  IS NULL THEN NULL ELSE to_jsonb(vtd)  - '{team_name,name_norm}'::text[] END AS defensive,
+    CASE WHEN vtpo.team_name IS NULL THEN NULL ELSE to_jsonb(vtpo) - '{team_name,name_norm}'::text[] END AS possession
   FROM base b
-  LEFT JOIN vs_team_standard                vts ON lower(imm_unaccent(vts.team_name))  = b.name_norm
-  LEFT JOIN vs_team_goalkeeping             vtg ON lower(imm_unaccent(vtg.team_name))  = b.name_norm
-  LEFT JOIN vs_team_shooting               vtsh ON lower(imm_unaccent(vtsh.team_name)) = b.name_norm
-  LEFT JOIN vs_team_passing                 vtp ON lower(imm_unaccent(vtp.team_name))  = b.name_norm
-  LEFT JOIN vs_team_pass_types             vtpt ON lower(imm_unaccent(vtpt.team_name)) = b.name_norm
-  LEFT JOIN vs_team_goal_and_shot_creation vtgc ON lower(imm_unaccent(vtgc.team_name)) = b.name_norm
-  LEFT JOIN vs_team_defensive               vtd ON lower(imm_unaccent(vtd.team_name))  = b.name_norm
-  LEFT JOIN vs_team_possession             vtpo ON lower(imm_unaccent(vtpo.team_name)) = b.name_norm
+  LEFT JOIN vs_team_standard                vts ON vts.name_norm  = b.name_norm
+  LEFT JOIN vs_team_goalkeeping             vtg ON vtg.name_norm  = b.name_norm
+  LEFT JOIN vs_team_shooting               vtsh ON vtsh.name_norm = b.name_norm
+  LEFT JOIN vs_team_passing                 vtp ON vtp.name_norm  = b.name_norm
+  LEFT JOIN vs_team_pass_types             vtpt ON vtpt.name_norm = b.name_norm
+  LEFT JOIN vs_team_goal_and_shot_creation vtgc ON vtgc.name_norm = b.name_norm
+  LEFT JOIN vs_team_defensive               vtd ON vtd.name_norm  = b.name_norm
+  LEFT JOIN vs_team_possession             vtpo ON vtpo.name_norm = b.name_norm
 )
 SELECT jsonb_object_agg(
   team_name,
@@ -138,6 +165,51 @@ FROM joined;
 $$;
 """
 
+# A table rather than a materialized view: the team_*/vs_team_* tables are dropped and
+# recreated by every ingest (to_sql replace), which a view depending on them would block.
+SQL_CREATE_FBREF_JSON_CACHE = r"""
+CREATE TABLE IF NOT EXISTS public.fbref_json_cache (
+  name         text PRIMARY KEY,
+  payload      jsonb,
+  refreshed_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+# Cached payload when present, else computed on the fly (fresh install, cache not filled yet)
+SQL_CREATE_GET_FBREF_TEAM_JSON_ALL = r"""
+CREATE OR REPLACE FUNCTION public.get_fbref_team_json_all()
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+SELECT COALESCE(
+  (SELECT payload FROM public.fbref_json_cache WHERE name = 'team_json_all'),
+  public.build_fbref_team_json_all()
+);
+$$;
+"""
+
+SQL_CREATE_GET_FBREF_VS_TEAM_JSON_ALL = r"""
+CREATE OR REPLACE FUNCTION public.get_fbref_vs_team_json_all()
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+SELECT COALESCE(
+  (SELECT payload FROM public.fbref_json_cache WHERE name = 'vs_team_json_all'),
+  public.build_fbref_vs_team_json_all()
+);
+$$;
+"""
+
+SQL_REFRESH_FBREF_JSON_CACHE = r"""
+INSERT INTO public.fbref_json_cache (name, payload, refreshed_at)
+VALUES ('team_json_all',    public.build_fbref_team_json_all(),    now()),
+       ('vs_team_json_all', public.build_fbref_vs_team_json_all(), now())
+ON CONFLICT (name) DO UPDATE
+  SET payload = EXCLUDED.payload, refreshed_at = EXCLUDED.refreshed_at;
+"""
+
 SQL_CREATE_GET_PLAYER_ALL_STATS = r"""
 CREATE OR REPLACE FUNCTION public.get_player_all_stats(p_name text)
 RETURNS jsonb
@@ -145,7 +217,8 @@ LANGUAGE sql
 STABLE
 AS $$
 WITH target AS (
-  SELECT id::text AS understat_player_id,
+  SELECT id,
+         id::text AS understat_player_id,
          player_name,
          team_title
   FROM players
@@ -159,16 +232,7 @@ x AS (  -- best xref row (highest confidence)
   JOIN target t ON t.understat_player_id = px.understat_player_id
   ORDER BY confidence DESC
   LIMIT 1
-),
--- Use DISTINCT ON to avoid dup rows per FBref table (safeguard)
-ps     AS (SELECT DISTINCT ON ("player_id") * FROM player_standard                      ORDER BY "player_id"),
-pgk    AS (SELECT DISTINCT ON ("player_id") * FROM player_goalkeeping                  ORDER BY "player_id"),
-p_shot AS (SELECT DISTINCT ON ("player_id") * FROM player_shooting                     ORDER BY "player_id"),
-p_pass AS (SELECT DISTINCT ON ("player_id") * FROM player_passing                      ORDER BY "player_id"),
-p_passt AS (SELECT DISTINCT ON ("player_id") * FROM "player_pass_types"                ORDER BY "player_id"),
-p_gsc  AS (SELECT DISTINCT ON ("player_id") * FROM "player_goal_and_shot_creation"     ORDER BY "player_id"),
-p_def  AS (SELECT DISTINCT ON ("player_id") * FROM player_defensive                    ORDER BY "player_id"),
-p_poss AS (SELECT DISTINCT ON ("player_id") * FROM player_possession                   ORDER BY "player_id")
+)
 
 SELECT
   jsonb_strip_nulls(
@@ -194,21 +258,67 @@ SELECT
     )
   ) AS all_stats
 FROM target t
-JOIN players u ON u.id::text = t.understat_player_id
+JOIN players u ON u.id = t.id
 CROSS JOIN x
-LEFT JOIN ps      ps_row      ON ps_row."player_id"::text  = x.fbref_player_id
-LEFT JOIN pgk     pgk_row     ON pgk_row."player_id"::text = x.fbref_player_id
-LEFT JOIN p_shot  p_shot_row  ON p_shot_row."player_id"::text = x.fbref_player_id
-LEFT JOIN p_pass  p_pass_row  ON p_pass_row."player_id"::text = x.fbref_player_id
-LEFT JOIN p_passt p_passt_row ON p_passt_row."player_id"::text = x.fbref_player_id
-LEFT JOIN p_gsc   p_gsc_row   ON p_gsc_row."player_id"::text = x.fbref_player_id
-LEFT JOIN p_def   p_def_row   ON p_def_row."player_id"::text = x.fbref_player_id
-LEFT JOIN p_poss  p_poss_row  ON p_poss_row."player_id"::text = x.fbref_player_id;
+-- one point lookup per FBref table (LIMIT 1 guards against dup rows; ORDER BY ctid keeps the
+-- pick stable, i.e. the first row the ingest wrote). player_id is stored as text by the
+-- ingest, same type as player_xref.fbref_player_id: no cast, plain index applies
+LEFT JOIN LATERAL (SELECT * FROM player_standard                 WHERE "player_id" = x.fbref_player_id ORDER BY ctid LIMIT 1) ps_row ON true
+LEFT JOIN LATERAL (SELECT * FROM player_goalkeeping              WHERE "player_id" = x.fbref_player_id ORDER BY ctid LIMIT 1) pgk_row ON true
+LEFT JOIN LATERAL (SELECT * FROM player_shooting                 WHERE "player_id" = x.fbref_player_id ORDER BY ctid LIMIT 1) p_shot_row ON true
+LEFT JOIN LATERAL (SELECT * FROM player_passing                  WHERE "player_id" = x.fbref_player_id ORDER BY ctid LIMIT 1) p_pass_row ON true
+LEFT JOIN LATERAL (SELECT * FROM "player_pass_types"             WHERE "player_id" = x.fbref_player_id ORDER BY ctid LIMIT 1) p_passt_row ON true
+LEFT JOIN LATERAL (SELECT * FROM "player_goal_and_shot_creation" WHERE "player_id" = x.fbref_player_id ORDER BY ctid LIMIT 1) p_gsc_row ON true
+LEFT JOIN LATERAL (SELECT * FROM player_defensive                WHERE "player_id" = x.fbref_player_id ORDER BY ctid LIMIT 1) p_def_row ON true
+LEFT JOIN LATERAL (SELECT * FROM player_possession               WHERE "player_id" = x.fbref_player_id ORDER BY ctid LIMIT 1) p_poss_row ON true;
 $$;
 """
 
 # ---------------------- SQL blocks (indexes) ----------------------
 
+# ---------------------- Materialized views ----------------------
+
+# League position of every team after each of its games, over the first R games where
+# R is the fewest any team has played. Ties: pts, goal difference, goals for, then name
+# (byte order, to match the API's Python sort).
+SQL_CREATE_WEEKLY_TABLE_MV = r"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.weekly_table AS
+WITH games AS (
+  SELECT match_id, date_utc, team_h::text AS team,
+         COALESCE(home_goals, 0) AS gf, COALESCE(away_goals, 0) AS ga
+  FROM match_info
+  UNION ALL
+  SELECT match_id, date_utc, team_a::text,
+         COALESCE(away_goals, 0), COALESCE(home_goals, 0)
+  FROM match_info
+),
+numbered AS (
+  SELECT team, gf, ga,
+         CASE WHEN gf > ga THEN 3 WHEN gf = ga THEN 1 ELSE 0 END AS pts,
+         row_number() OVER (PARTITION BY team ORDER BY date_utc NULLS FIRST, match_id) AS week
+  FROM games
+),
+running AS (
+  SELECT team, week,
+         sum(pts) OVER w AS pts,
+         sum(gf)  OVER w AS gf,
+         sum(ga)  OVER w AS ga
+  FROM numbered
+  WINDOW w AS (PARTITION BY team ORDER BY week)
+)
+SELECT team, week::int AS week,
+       row_number() OVER (PARTITION BY week
+                          ORDER BY pts DESC, gf - ga DESC, gf DESC, team COLLATE "C")::int AS pos,
+       pts::int AS pts, gf::int AS gf, ga::int AS ga
+FROM running
+WHERE week <= (SELECT min(n) FROM (SELECT count(*) AS n FROM games GROUP BY team) c);
+
+-- REFRESH ... CONCURRENTLY needs a unique index
+CREATE UNIQUE INDEX IF NOT EXISTS idx_weekly_table_team_week ON public.weekly_table (team, week);
+"""
+
+SQL_REFRESH_WEEKLY_TABLE_MV = "REFRESH MATERIALIZED VIEW CONCURRENTLY public.weekly_table;"
+
 INDEX_STATEMENTS = (
     # Players / xref
     'CREATE INDEX IF NOT EXISTS idx_players_name_lower ON players (lower(player_name));',
@@ -230,6 +340,22 @@ INDEX_STATEMENTS_CONCURRENTLY = tuple(
     for s in INDEX_STATEMENTS
 )
 
+# get_player_all_stats reads whole rows (to_jsonb(row)), so an INCLUDE list can't make those
+# lookups index-only; instead store each table in player_id order and refresh its stats
+PLAYER_PID_INDEXES = (
+    ("player_standard", "idx_fbref_std_pid"),
+    ("player_goalkeeping", "idx_fbref_gk_pid"),
+    ("player_shooting", "idx_fbref_shot_pid"),
+    ("player_passing", "idx_fbref_pass_pid"),
+    ("player_pass_types", "idx_fbref_passt_pid"),
+    ("player_goal_and_shot_creation", "idx_fbref_gsc_pid"),
+    ("player_defensive", "idx_fbref_def_pid"),
+    ("player_possession", "idx_fbref_poss_pid"),
+)
+SQL_CLUSTER_PLAYER_TABLES = "\n".join(
+    f'CLUSTER "{t}" USING {idx};\nANALYZE "{t}";' for t, idx in PLAYER_PID_INDEXES
+)
+
 # ---------------------- Installers ----------------------
 
 def install_fbref_sql(engine: Engine, schema: str = "public") -> None:
@@ -255,8 +381,18 @@ def install_fbref_sql(engine: Engine, schema: str = "public") -> None:
 
         # 2) imm_unaccent
         conn.exec_driver_sql(SQL_CREATE_IMM_UNACCENT)
+        try:
+            with conn.begin_nested():
+                conn.exec_driver_sql(SQL_IMM_UNACCENT_LEAKPROOF)
+        except Exception:
+            # not a superuser: keep the function as is (STRICT still skips NULL inputs)
+            pass
 
-        # 3) big JSON team functions
+        # 3) big JSON team functions + their cache (builders join on name_norm)
+        conn.exec_driver_sql(SQL_ADD_TEAM_NAME_NORM)
+        conn.exec_driver_sql(SQL_CREATE_BUILD_FBREF_TEAM_JSON_ALL)
+        conn.exec_driver_sql(SQL_CREATE_BUILD_FBREF_VS_TEAM_JSON_ALL)
+        conn.exec_driver_sql(SQL_CREATE_FBREF_JSON_CACHE)
         conn.exec_driver_sql(SQL_CREATE_GET_FBREF_TEAM_JSON_ALL)
         conn.exec_driver_sql(SQL_CREATE_GET_FBREF_VS_TEAM_JSON_ALL)
 
@@ -275,19 +411,42 @@ def create_indexes(engine: Engine, concurrently: bool = False, schema: str = "pu
             for sql in stmts:
                 conn.exec_driver_sql(sql)
     else:
-        # Safe to run all in a single transaction (locks apply)
+        # Safe to run all in a single transaction (locks apply); one round-trip for the batch
         with engine.begin() as conn:
             conn.exec_driver_sql(f"SET search_path TO {schema};")
-            for sql in stmts:
-                conn.exec_driver_sql(sql)
+            conn.exec_driver_sql("\n".join(stmts))
+
+def cluster_player_tables(engine: Engine, schema: str = "public") -> None:
+    # opt-in maintenance (FBREF_CLUSTER_PLAYER_TABLES): CLUSTER holds ACCESS EXCLUSIVE on each
+    # table until its rewrite is done, blocking API reads, and the next ingest undoes the order
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"SET search_path TO {schema};")
+        conn.exec_driver_sql(SQL_CLUSTER_PLAYER_TABLES)
+
+def install_weekly_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(SQL_CREATE_WEEKLY_TABLE_MV)
+
+def refresh_weekly_table(engine: Engine) -> None:
+    # readers keep seeing the previous contents until the refresh commits
+    with engine.begin() as conn:
+        conn.exec_driver_sql(SQL_REFRESH_WEEKLY_TABLE_MV)
+
+def refresh_fbref_json_cache(engine: Engine) -> None:
+    # rebuild both team payloads once, right after the fbref tables were replaced
+    with engine.begin() as conn:
+        conn.exec_driver_sql(SQL_ADD_TEAM_NAME_NORM)
+        conn.exec_driver_sql(SQL_REFRESH_FBREF_JSON_CACHE)
 
 # ---------------------- Validators ----------------------
 
 def validate_functions(engine: Engine) -> bool:
 
     qry = """
-        SELECT COUNT(*) = 4 AS ok FROM (
+        SELECT COUNT(*) = 6 AS ok FROM (
           SELECT 'imm_unaccent' AS fn
+          UNION ALL SELECT 'build_fbref_team_json_all'
+          UNION ALL SELECT 'build_fbref_vs_team_json_all'
           UNION ALL SELECT 'get_fbref_team_json_all'
           UNION ALL SELECT 'get_fbref_vs_team_json_all'
           UNION ALL SELECT 'get_player_all_stats'
@@ -303,5 +462,7 @@ def validate_functions(engine: Engine) -> bool:
 def install(engine):
 
     install_fbref_sql(engine)
+    install_weekly_table(engine)
     create_indexes(engine)
+    refresh_fbref_json_cache(engine)
     print("Install complete. Functions OK:", validate_functions(engine))
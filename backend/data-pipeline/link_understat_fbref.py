@@ -1,7 +1,11 @@
 import os, re, unicodedata, logging, uuid
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
 
+from db_helper import to_sql_copy
+
 LOG = logging.getLogger("link_xref")
 LOG.setLevel(getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper()))
 
@@ -24,6 +28,7 @@ ALIASES = {
     "Wolves": "Wolverhampton Wanderers",
     "Leeds United": "Leeds",
 }
+@lru_cache(maxsize=4096)
 def _norm(s: str) -> str:
     if s is None: return ""
     s = str(s).strip().lower()
@@ -31,15 +36,47 @@ def _norm(s: str) -> str:
     s = _punct.sub(" ", s)
     s = _ws.sub(" ", s).strip()
     return s
+# keyed (and valued) in _norm form, so lookups on normalized names actually hit
+ALIASES_NORM = {_norm(k): _norm(v) for k, v in ALIASES.items()}
+@lru_cache(maxsize=2048)
 def _norm_team(s: str) -> str:
     s2 = _norm(s)
-    return ALIASES.get(s2, s2)
+    return ALIASES_NORM.get(s2, s2)
+
+# column-wide versions of the two above, as pandas string ops instead of a call per row
+def _norm_series(s: pd.Series) -> pd.Series:
+    return (s.where(s.notna(), "").astype(str)
+             .str.strip().str.lower()
+             .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+             .str.replace(_punct, " ", regex=True)
+             .str.replace(_ws, " ", regex=True)
+             .str.strip())
+def _norm_team_series(s: pd.Series) -> pd.Series:
+    # team columns hold ~20 distinct names: normalize those once and map back onto the rows
+    codes, uniq = pd.factorize(s, use_na_sentinel=False)
+    n = _norm_series(pd.Series(uniq, dtype=object))
+    n = n.map(ALIASES_NORM).fillna(n)
+    return pd.Series(n.to_numpy()[codes], index=s.index)
 
 def _sim(a, b):
     if HAVE_RF:
         return float(fuzz.token_set_ratio(a, b))
     return 100.0 * difflib.SequenceMatcher(None, a, b).ratio()
 
+def _score_matrix(queries, choices) -> np.ndarray:
+    """_sim for every (query, choice) pair: a len(queries) x len(choices) float matrix."""
+    if HAVE_RF:
+        return process.cdist(queries, choices, scorer=fuzz.token_set_ratio, workers=-1, dtype=np.float64)
+    # difflib fallback: SequenceMatcher caches its analysis of seq2, so hold each choice there
+    out = np.empty((len(queries), len(choices)), dtype=np.float64)
+    sm = difflib.SequenceMatcher(None)
+    for j, c in enumerate(choices):
+        sm.set_seq2(c)
+        for i, q in enumerate(queries):
+            sm.set_seq1(q)
+            out[i, j] = 100.0 * sm.ratio()
+    return out
+
 # ───────────────────────────── schema utilities
 FBREF_CATEGORIES = [
     "standard","goalkeeping","shooting","passing",
@@ -75,7 +112,7 @@ def _get_col(cols, *candidates):
 # ───────────────────────────── xrefs
 def build_team_xref(engine):
     teams = pd.read_sql('select team_id, team_name from epl_teams', engine)
-    teams['norm_name'] = teams['team_name'].map(_norm_team)
+    teams['norm_name'] = _norm_team_series(teams['team_name'])
 
     # use team_standard if present; else derive from any team_* table
     table = "team_standard" if "team_standard" in _existing_tables(engine) else None
@@ -89,25 +126,24 @@ def build_team_xref(engine):
 
     fb = pd.read_sql(f'select distinct "team_name" as fbref_name, "team_id_x" as fbref_team_id from "{table}"', engine)
     fb.columns = [c.lower() for c in fb.columns]
-    fb['norm_name'] = fb['fbref_name'].map(_norm_team)
+    fb['norm_name'] = _norm_team_series(fb['fbref_name'])
 
     merged = fb.merge(teams, left_on='norm_name', right_on='norm_name', how='left')
-    # fuzzy map any leftovers
+    # fuzzy map any leftovers: all missing names scored against all candidates at once
     missing = merged[merged['team_id'].isna()]
-    if not missing.empty:
+    if not missing.empty and not teams.empty:
         cand = list(teams['norm_name'].unique())
+        scores = _score_matrix(missing['norm_name'].tolist(), cand)
+        best = scores.argmax(axis=1)
+        best_score = scores[np.arange(len(missing)), best]
+        first_team = teams.drop_duplicates('norm_name').set_index('norm_name')
         fixes = []
-        for _, r in missing.iterrows():
-            if HAVE_RF:
-                best = process.extractOne(r['norm_name'], cand, scorer=fuzz.token_set_ratio)
-                choice, score = (best[0], best[1]) if best else ("", 0.0)
-            else:
-                choice, score = max(((c, _sim(r['norm_name'], c)) for c in cand), key=lambda x: x[1])
+        for r, j, score in zip(missing.itertuples(index=False), best, best_score):
             if score >= 90:
-                trow = teams.loc[teams['norm_name']==choice].iloc[0]
+                trow = first_team.loc[cand[j]]
                 fixes.append({
-                    "fbref_name": r["fbref_name"],
-                    "fbref_team_id": r["fbref_team_id"],
+                    "fbref_name": r.fbref_name,
+                    "fbref_team_id": r.fbref_team_id,
                     "team_id": trow["team_id"],
                     "team_name": trow["team_name"],
                 })
@@ -117,7 +153,7 @@ def build_team_xref(engine):
             merged = pd.concat([ok, fixed], ignore_index=True)
 
     out = merged.dropna(subset=['team_id'])[['fbref_team_id','fbref_name','team_id','team_name']].drop_duplicates()
-    out.to_sql("team_xref", engine, if_exists="replace", index=False)
+    out.to_sql("team_xref", engine, if_exists="replace", index=False, method=to_sql_copy)
     with engine.begin() as c:
         c.execute(text('CREATE INDEX IF NOT EXISTS idx_team_xref_fbref ON team_xref(fbref_team_id)'))
         c.execute(text('CREATE INDEX IF NOT EXISTS idx_team_xref_team ON team_xref(team_id)'))
@@ -141,7 +177,7 @@ def _load_fbref_players(engine, table) -> pd.DataFrame:
 def build_player_xref(engine, strict=97, fuzzy=90):
     # team map
     tx = pd.read_sql('select team_id, team_name, fbref_team_id, fbref_name from team_xref', engine)
-    tx['norm_team'] = tx['team_name'].map(_norm_team)
+    tx['norm_team'] = _norm_team_series(tx['team_name'])
 
     # understat players
     up = pd.read_sql("""
@@ -149,8 +185,8 @@ def build_player_xref(engine, strict=97, fuzzy=90):
                player_name, team_title, coalesce(position,'') as position
         from players
     """, engine)
-    up['norm_name'] = up['player_name'].map(_norm)
-    up['norm_team'] = up['team_title'].map(_norm_team)
+    up['norm_name'] = _norm_series(up['player_name'])
+    up['norm_team'] = _norm_team_series(up['team_title'])
     up = up.merge(tx[['team_id','norm_team']].drop_duplicates('team_id'),
                   on='norm_team', how='left')
     up = up.rename(columns={'team_id': 'understat_team_id'})
@@ -158,96 +194,114 @@ def build_player_xref(engine, strict=97, fuzzy=90):
     # fbref players (from chosen table) + attach canonical team_id
     fb_table = _pick_fbref_player_table(engine)
     fp = _load_fbref_players(engine, fb_table)
-    fp['norm_name'] = fp['fbref_name'].map(_norm)
-    fp['norm_team'] = fp['fbref_team'].map(_norm_team)
+    fp['norm_name'] = _norm_series(fp['fbref_name'])
+    fp['norm_team'] = _norm_team_series(fp['fbref_team'])
     fp = fp.merge(
         tx[['fbref_team_id','norm_team','team_id']].rename(columns={'team_id':'fbref_team_id_canon'}),
         on='norm_team', how='left'
     )
 
-    fb_by_team = {t: df for t, df in fp.groupby('fbref_team_id_canon')}
+    # per team, parallel arrays (struct-of-arrays) instead of a DataFrame per group
+    fb_by_team = {
+        tid: {
+            'norm': g['norm_name'].to_numpy(),
+            'pid': g['fbref_player_id'].to_numpy(),
+            'name': g['fbref_name'].to_numpy(),
+            'pos': g['fbref_pos'].fillna("").astype(str).str.lower().to_numpy(dtype=str),
+            'tid_canon': g['fbref_team_id_canon'].to_numpy(),
+        }
+        for tid, g in fp.groupby('fbref_team_id_canon', sort=False)
+    }
 
-    xrows, umiss = [], []
-    for _, r in up.iterrows():
-        u_name = r['norm_name']; u_team = r['understat_team_id']
+    # exact matches in one hash join on (team, normalized name) across all teams; only the
+    # understat rows without a hit go to the fuzzy scorer. _k = position in fb_by_team arrays
+    fk = fp.dropna(subset=['fbref_team_id_canon'])
+    fk = fk.assign(_k=fk.groupby('fbref_team_id_canon', sort=False).cumcount())
+    exact_hits = (
+        up[['understat_team_id', 'norm_name']].reset_index()
+        .merge(fk[['fbref_team_id_canon', 'norm_name', '_k']],
+               left_on=['understat_team_id', 'norm_name'],
+               right_on=['fbref_team_id_canon', 'norm_name'])
+        .groupby('index')['_k'].agg(sorted)
+        .to_dict()
+    )
+
+    # fuzzy: one score matrix per team (unmatched understat players x fbref players)
+    results = {}  # position in `up` -> xref row / miss row, emitted in `up` order below
+    for u_team, ug in up.groupby('understat_team_id', sort=False, dropna=False):
         cands = fb_by_team.get(u_team)
-        if cands is None or cands.empty:
-            umiss.append({"understat_player_id": r['understat_player_id'],
-                          "player_name": r['player_name'],
-                          "understat_team_id": u_team,
-                          "reason": "no_team_candidates"})
+        if cands is None or not len(cands['norm']):
+            for i, r in zip(ug.index, ug.itertuples(index=False)):
+                results[i] = (False, {"understat_player_id": r.understat_player_id,
+                                      "player_name": r.player_name,
+                                      "understat_team_id": u_team,
+                                      "reason": "no_team_candidates"})
             continue
 
-        exact = cands[cands['norm_name'] == u_name]
-        if len(exact) == 1:
-            ex = exact.iloc[0]
-            xrows.append({
-                "canonical_player_id": str(uuid.uuid4()),
-                "understat_player_id": r['understat_player_id'],
-                "fbref_player_id": ex['fbref_player_id'],
-                "understat_name": r['player_name'],
-                "fbref_name": ex['fbref_name'],
-                "understat_team_id": u_team,
-                "fbref_team_id": ex['fbref_team_id_canon'],
-                "method": "exact_norm_same_team",
-                "confidence": 100.0
-            })
-            continue
-        elif len(exact) > 1:
-            # tie-break on first letter of position if we have it
-            pos = (r.get('position') or "").lower()[:1]
-            ex2 = exact.copy()
-            if pos:
-                ex2['pos_match'] = ex2['fbref_pos'].fillna("").str.lower().str.startswith(pos)
-                ex2 = ex2.sort_values(by=['pos_match'], ascending=False)
-            ex = ex2.iloc[0]
-            xrows.append({
+        u_names = ug['norm_name'].to_numpy()
+        f_names, f_ids, f_disp = cands['norm'], cands['pid'], cands['name']
+        f_team, f_pos = cands['tid_canon'], cands['pos']
+
+        hits_by_row = [exact_hits.get(i, ()) for i in ug.index]
+        need_fuzzy = np.array([not h for h in hits_by_row])
+        scores = np.zeros((len(ug), len(f_names)))
+        if need_fuzzy.any():
+            scores[need_fuzzy] = _score_matrix(list(u_names[need_fuzzy]), list(f_names))
+        best = scores.argmax(axis=1)
+        best_score = scores[np.arange(len(ug)), best]
+
+        for k, (i, r) in enumerate(zip(ug.index, ug.itertuples(index=False))):
+            hits = hits_by_row[k]
+            if len(hits) == 1:
+                j = hits[0]
+                method, confidence = "exact_norm_same_team", 100.0
+            elif len(hits) > 1:
+                # tie-break on first letter of position if we have it
+                hits = np.asarray(hits)
+                pos = (r.position or "").lower()[:1]
+                if pos:
+                    pos_hits = hits[np.char.startswith(f_pos[hits], pos)]
+                    hits = pos_hits if len(pos_hits) else hits
+                j = int(hits[0])
+                method, confidence = "exact_norm_same_team_tiebreak", 99.0
+            else:
+                # fuzzy within team
+                j, score = int(best[k]), float(best_score[k])
+                if score >= strict:
+                    method = 'fuzzy_strict_same_team'
+                elif score >= fuzzy:
+                    method = 'fuzzy_same_team'
+                else:
+                    results[i] = (False, {"understat_player_id": r.understat_player_id,
+                                          "player_name": r.player_name,
+                                          "understat_team_id": u_team,
+                                          "best_candidate": f_disp[j],
+                                          "best_score": score,
+                                          "reason": "low_score"})
+                    continue
+                confidence = score
+
+            results[i] = (True, {
                 "canonical_player_id": str(uuid.uuid4()),
-                "understat_player_id": r['understat_player_id'],
-                "fbref_player_id": ex['fbref_player_id'],
-                "understat_name": r['player_name'],
-                "fbref_name": ex['fbref_name'],
+                "understat_player_id": r.understat_player_id,
+                "fbref_player_id": f_ids[j],
+                "understat_name": r.player_name,
+                "fbref_name": f_disp[j],
                 "understat_team_id": u_team,
-                "fbref_team_id": ex['fbref_team_id_canon'],
-                "method": "exact_norm_same_team_tiebreak",
-                "confidence": 99.0
+                "fbref_team_id": f_team[j],
+                "method": method,
+                "confidence": confidence,
             })
-            continue
-
-        # fuzzy within team
-        cand = cands.copy()
-        cand['score'] = cand['norm_name'].map(lambda n: _sim(u_name, n))
-        cand = cand.sort_values('score', ascending=False)
-        top = cand.iloc[0]
-        if top['score'] >= strict:
-            method = 'fuzzy_strict_same_team'
-        elif top['score'] >= fuzzy:
-            method = 'fuzzy_same_team'
-        else:
-            umiss.append({"understat_player_id": r['understat_player_id'],
-                          "player_name": r['player_name'],
-                          "understat_team_id": u_team,
-                          "best_candidate": top['fbref_name'],
-                          "best_score": float(top['score']),
-                          "reason": "low_score"})
-            continue
 
-        xrows.append({
-            "canonical_player_id": str(uuid.uuid4()),
-            "understat_player_id": r['understat_player_id'],
-            "fbref_player_id": top['fbref_player_id'],
-            "understat_name": r['player_name'],
-            "fbref_name": top['fbref_name'],
-            "understat_team_id": u_team,
-            "fbref_team_id": top['fbref_team_id_canon'],
-            "method": method,
-            "confidence": float(top['score']),
-        })
+    ordered = [results[i] for i in up.index]
+    xrows = [row for matched, row in ordered if matched]
+    umiss = [row for matched, row in ordered if not matched]
 
     xdf = pd.DataFrame(xrows)
     udf = pd.DataFrame(umiss)
-    xdf.to_sql("player_xref", engine, if_exists="replace", index=False)
-    udf.to_sql("player_xref_unmatched", engine, if_exists="replace", index=False)
+    xdf.to_sql("player_xref", engine, if_exists="replace", index=False, method=to_sql_copy)
+    udf.to_sql("player_xref_unmatched", engine, if_exists="replace", index=False,
+                method=to_sql_copy)
     with engine.begin() as c:
         c.execute(text('CREATE INDEX IF NOT EXISTS idx_xref_understat ON player_xref(understat_player_id)'))
         c.execute(text('CREATE INDEX IF NOT EXISTS idx_xref_fbref ON player_xref(fbref_player_id)'))
@@ -12,6 +12,8 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.dialects.postgresql import JSONB
 
+from pg_copy import to_sql_copy
+
 
 FPL_BOOTSTRAP_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
 
@@ -208,10 +210,9 @@ def normalize_elements(df: pd.DataFrame) -> pd.DataFrame:
 
     extra_cols = [c for c in df.columns if c not in known]
     if extra_cols:
-        def row_to_extra(r: pd.Series) -> dict:
-            d = {k: r[k] for k in extra_cols}
-            return deep_clean_json(d)
-        out["extra"] = df.apply(row_to_extra, axis=1)
+        # zip over per-column object arrays: no Series built per row like apply(axis=1)
+        arrays = [df[c].to_numpy(dtype=object) for c in extra_cols]
+        out["extra"] = [deep_clean_json(dict(zip(extra_cols, row))) for row in zip(*arrays)]
     else:
         out["extra"] = [{} for _ in range(len(out))]
 
@@ -259,6 +260,7 @@ def replace_all(engine: Engine, payload: Dict[str, Any]) -> None:
         con=engine,
         if_exists="replace",
         index=False,
+        method=to_sql_copy,
         dtype={"payload": JSONB}
     )
 
@@ -269,6 +271,7 @@ def replace_all(engine: Engine, payload: Dict[str, Any]) -> None:
         con=engine,
         if_exists="replace",
         index=False,
+        method=to_sql_copy,
         dtype={
             "chip_plays": JSONB,
             "top_element_info": JSONB,
@@ -281,20 +284,21 @@ def replace_all(engine: Engine, payload: Dict[str, Any]) -> None:
         con=engine,
         if_exists="replace",
         index=False,
+        method=to_sql_copy,
         dtype={"settings": JSONB}
     )
 
     (phases_df if not phases_df.empty else pd.DataFrame()).to_sql(
-        "fpl_phases", con=engine, if_exists="replace", index=False
+        "fpl_phases", con=engine, if_exists="replace", index=False, method=to_sql_copy
     )
     (teams_df if not teams_df.empty else pd.DataFrame()).to_sql(
-        "fpl_teams", con=engine, if_exists="replace", index=False
+        "fpl_teams", con=engine, if_exists="replace", index=False, method=to_sql_copy
     )
     (element_stats_df if not element_stats_df.empty else pd.DataFrame()).to_sql(
-        "fpl_element_stats", con=engine, if_exists="replace", index=False
+        "fpl_element_stats", con=engine, if_exists="replace", index=False, method=to_sql_copy
     )
     (element_types_df if not element_types_df.empty else pd.DataFrame()).to_sql(
-        "fpl_element_types", con=engine, if_exists="replace", index=False
+        "fpl_element_types", con=engine, if_exists="replace", index=False, method=to_sql_copy
     )
 
     with engine.begin() as conn:
@@ -18,6 +18,8 @@ from difflib import SequenceMatcher
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 
+from pg_copy import to_sql_copy
+
 # ---------- Config (edit if needed) ----------
 API_TOKEN = os.environ.get("API_TOKEN")
 PLAYERS_URL = "http://epl-api.epl-data.svc.cluster.local:8000/fbref/players"
@@ -463,7 +465,7 @@ def main(conn):
     with engine.begin() as conn:
 
         tmp_table = f"{args.table}_tmp"
-        df.to_sql(tmp_table, con=conn, if_exists="replace", index=False)
+        df.to_sql(tmp_table, con=conn, if_exists="replace", index=False, method=to_sql_copy)
 
         # Optional helpful indexes
         for stmt in [
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# COPY writer shared by the FPL loaders (DataFrame.to_sql method=)
+
+from __future__ import annotations
+import csv
+import json
+from io import StringIO
+
+from sqlalchemy.types import JSON
+
+
+def to_sql_copy(table, conn, keys, data_iter) -> None:
+    """
+    DataFrame.to_sql method=: pandas still creates/replaces the table, the rows are
+    streamed from data_iter as COPY CSV (NULL \\N, so empty strings stay empty strings).
+    JSON/JSONB columns are json-encoded like SQLAlchemy would (None -> null); dict/list
+    cells elsewhere are json-encoded too.
+    """
+    json_idx = [i for i, k in enumerate(keys) if isinstance(table.table.c[k].type, JSON)]
+    buf = StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    for row in data_iter:
+        row = list(row)
+        for i in json_idx:
+            row[i] = json.dumps(row[i], default=str)
+        w.writerow([
+            "\\N" if v is None else json.dumps(v, default=str) if isinstance(v, (dict, list)) else v
+            for v in row
+        ])
+    buf.seek(0)
+
+    cols = ", ".join(f'"{k}"' for k in keys)
+    fqtn = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(sql=f"COPY {fqtn} ({cols}) FROM STDIN WITH (FORMAT CSV, NULL '\\N')", file=buf)